@@ -0,0 +1,68 @@
+"""
+Per-message memory of decoded responses, compared with the
+dict based RtuMessage layout the library used before __slots__.
+
+    python benchmarks/message_memory.py [count]
+"""
+import sys
+import tracemalloc
+
+from modbus_rtu_client.base import RtuMessage
+from modbus_rtu_client.crc import cal_crc
+
+
+class LegacyRtuMessage:
+    """
+    the old layout: instance __dict__ and sliced copies of the frame
+    """
+    def __init__(self):
+        self._addr = None
+        self._func = None
+        self._data_bytes = b''
+        self._crc_bytes = b''
+
+    def decode(self, raw_message):
+        self._addr = raw_message[0]
+        self._func = raw_message[1]
+        self._data_bytes = raw_message[2:-2]
+        self._crc_bytes = raw_message[-2:]
+
+
+def make_frames(count, regs=10):
+    frames = []
+    for i in range(count):
+        raw = bytes((i % 247 + 1, 0x04, regs * 2)) + bytes(regs * 2)
+        frames.append(raw + cal_crc(raw).to_bytes(2, "little"))
+    return frames
+
+
+def measure(cls, frames):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    messages = []
+    for f in frames:
+        m = cls()
+        m.decode(f)
+        messages.append(m)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(s.size_diff for s in stats)
+    # the list holding the messages is the same for both layouts
+    size -= sys.getsizeof(messages)
+    return size / len(frames)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    frames = make_frames(count)
+    legacy = measure(LegacyRtuMessage, frames)
+    compact = measure(RtuMessage, frames)
+    print(f"messages:            {count}")
+    print(f"legacy bytes/msg:    {legacy:.1f}")
+    print(f"compact bytes/msg:   {compact:.1f}")
+    print(f"saved bytes/msg:     {legacy - compact:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmarks for the hot paths: crc, frame building, encode/decode,
+the receive loop, response decoding and whole transactions against
+the in-process loopback slave.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json --tolerance 0.25
+
+With --baseline the run fails (exit code 1) when any case drops more
+than tolerance below its baseline ops/s.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+from modbus_rtu_client.base import ModBusRtuClient, RtuMessage
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer, FRAME_CACHE
+from modbus_rtu_client.metrics import BusMetrics
+from modbus_rtu_client.crc import cal_crc, cal_crc_table8, cal_crc_table16
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+CASES = {}
+
+
+def case(name, per=1, unit="ops"):
+    """
+    per scales ops/s to the unit, e.g. bytes handled per call
+    """
+    def register(setup):
+        CASES[name] = (setup, per, unit)
+        return setup
+    return register
+
+
+def frame(raw):
+    return raw + cal_crc(raw).to_bytes(2, "little")
+
+
+for size in (8, 64, 256):
+    data = os.urandom(size)
+    case(f"crc_table8_{size}B", size, "bytes")(
+        lambda data=data: lambda: cal_crc_table8(data)
+    )
+    case(f"crc_table16_{size}B", size, "bytes")(
+        lambda data=data: lambda: cal_crc_table16(data)
+    )
+
+
+@case("cmd_read_ai_info_uncached")
+def cmd_uncached():
+    def run():
+        FRAME_CACHE.clear()
+        Cmd.read_ai_info(1, 1000, 20)
+    return run
+
+
+@case("cmd_read_ai_info_cached")
+def cmd_cached():
+    return lambda: Cmd.read_ai_info(1, 1000, 20)
+
+
+@case("message_encode")
+def message_encode():
+    return lambda: RtuMessage(1, 4, b'\x03\xe8\x00\x14').encode()
+
+
+@case("message_decode")
+def message_decode():
+    raw = frame(b'\x01\x04\xfa' + bytes(250))
+
+    def run():
+        RtuMessage().decode(raw)
+    return run
+
+
+class ReplayConn:
+    """
+    hands out the same response for every transaction, no timing
+    """
+    def __init__(self, response):
+        self.response = response
+        self.pos = len(response)
+
+    def write(self, data):
+        self.pos = 0
+        return len(data)
+
+    def read(self, size=1):
+        out = self.response[self.pos:self.pos + size]
+        self.pos += len(out)
+        return out
+
+
+@case("recv_125_regs", 255, "bytes")
+def recv_frame():
+    sent = Cmd.read_ai_info(1, 0, 125)
+    conn = ReplayConn(frame(b'\x01\x04\xfa' + bytes(250)))
+    client = ModBusRtuClient(conn)
+
+    def run():
+        conn.pos = 0
+        client.recv(sent)
+    return run
+
+
+@case("resp_read_ai_info_125_regs", 125, "regs")
+def resp_analyzer():
+    resp = RtuMessage()
+    resp.decode(frame(b'\x01\x04\xfa' + bytes(range(250))))
+    return lambda: RespAnalyzer.read_ai_info(resp)
+
+
+@case("resp_read_registers_125_regs", 125, "regs")
+def resp_registers():
+    resp = RtuMessage()
+    resp.decode(frame(b'\x01\x04\xfa' + bytes(range(250))))
+    return lambda: RespAnalyzer.read_registers(resp, "i2")
+
+
+@case("transaction_loopback")
+def transaction():
+    client = ModBusRtuClient(LoopbackConn(SimulatedSlave(1)), frm_time=0)
+    send = Cmd.read_ai_info(1, 0, 10)
+    return lambda: client.query(send)
+
+
+@case("transaction_loopback_metrics")
+def transaction_metrics():
+    client = ModBusRtuClient(
+        LoopbackConn(SimulatedSlave(1)), frm_time=0, metrics=BusMetrics()
+    )
+    send = Cmd.read_ai_info(1, 0, 10)
+    return lambda: client.query(send)
+
+
+def measure(setup, repeat):
+    timer = timeit.Timer(setup())
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number))
+    return number / best
+
+
+def run(names, repeat):
+    results = {}
+    for name in names:
+        setup, per, unit = CASES[name]
+        ops = measure(setup, repeat)
+        results[name] = {
+            "ops_per_sec": ops,
+            f"{unit}_per_sec": ops * per,
+        }
+        print(f"{name:32s} {ops:14,.0f} ops/s {ops * per:16,.0f} {unit}/s")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, base in baseline.items():
+        if name not in results:
+            continue
+        ratio = results[name]["ops_per_sec"] / base["ops_per_sec"]
+        if ratio < 1 - tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", "--filter", default="")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output")
+    parser.add_argument("-b", "--baseline")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    names = [n for n in CASES if args.filter in n]
+    results = run(names, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.0%} of baseline")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,8 @@
 from modbus_rtu_client.base import ModBusRtuClient
 from modbus_rtu_client.base import RtuMessage, RtuResponseError
-from modbus_rtu_client.cmd import Cmd, RespAnalyzer
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer, iter_points
 import serial
 import math
-from bitarray import bitarray
 
 
 def time_per_frame(ser: serial.Serial):
@@ -39,7 +38,7 @@ class Dam0400Client(ModBusRtuClient):
             ser.open()
 
         frm_time = time_per_frame(ser)
-        super().__init__(ser, frm_time)
+        super().__init__(ser, frm_time, response_timeout=0.1)
         self._init_slave()
 
     def _init_slave(self):
@@ -59,23 +58,6 @@ class Dam0400Client(ModBusRtuClient):
         res = self.recv(qry_msg)
         return res
 
-    def conv_resp_data(self, data_bytes, keyname, byte_len=1):
-        r_data = {}
-        for i, n in enumerate(data_bytes):
-            base = i * byte_len * 8
-            d = n
-            if isinstance(n, int):
-                d = bitarray()
-                d.frombytes(n.to_bytes(byte_len, self.byteorder))
-            k = [base + j for j in range(len(d) - 1, -1, -1)]
-            v = d.tolist()
-            r_data.update(dict(zip(k, v)))
-        return {
-            f"{keyname}_{k}": r_data[k] 
-            for k in r_data 
-            if k < self._dodi_num
-        }
-
     def open_do(self, io: int):
         if io > (self._dodi_num - 1) or io < 0:
             msg = (
@@ -108,15 +90,13 @@ class Dam0400Client(ModBusRtuClient):
 
     def read_do(self):
         send = Cmd.read_do(self._slave_addr, self._dodi_num)
-        raw_resp = self.query(send)
-        resp = RespAnalyzer.read_do(raw_resp)
-        return self.conv_resp_data(resp, "do")
+        bits = RespAnalyzer.read_bits(self.query(send), self._dodi_num)
+        return dict(iter_points(bits, "do"))
 
     def read_di(self):
         send = Cmd.read_di(self._slave_addr, self._dodi_num)
-        raw_resp = self.query(send)
-        resp = RespAnalyzer.read_di(raw_resp)
-        return self.conv_resp_data(resp, "di")
+        bits = RespAnalyzer.read_bits(self.query(send), self._dodi_num)
+        return dict(iter_points(bits, "di"))
 
     def read_ai_info(self, ai, quantity):
         send = Cmd.read_ai_info(self._slave_addr, ai, quantity)
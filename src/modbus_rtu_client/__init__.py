@@ -1,2 +1,17 @@
 from .base import ModBusRtuClient, RtuMessage, FUNCTION_CODE, RtuResponseError
-from .cmd import Cmd, RespAnalyzer
+from .base import RtuReceiveAbort, RtuReceiveTimeout, RtuExceptionResponse
+from .cmd import Cmd, RespAnalyzer, FrameCache, FRAME_CACHE
+from .aio import AsyncModBusRtuClient
+from .scheduler import PollJob, PollScheduler
+from .planner import ReadPoint, read_point, plan_reads, execute_plan
+from .sniffer import BusSniffer, SniffedFrame, sniff
+from .sim import SimulatedSlave, LoopbackConn
+from .metrics import BusMetrics
+from .adaptive import LatencyProfile, RetryPolicy, AdaptiveClient
+from .breaker import CircuitBreaker, RtuSlaveOffline
+from .changes import SnapshotStore, Change
+from .timeseries import RingBuffer, SeriesWriter, read_series
+from .profile import CompiledProfile, compile_profile
+from .gateway import BusGateway, GatewayClient
+from .tcp import TcpConn, ModBusTcpClient, ConnectionPool
+from .worker import BusWorker
@@ -0,0 +1,158 @@
+import json
+import math
+import time
+from collections import deque
+from .base import (
+    ModBusRtuClient, RtuMessage, RtuReceiveAbort, RtuReceiveTimeout,
+    RtuExceptionResponse
+)
+
+
+class LatencyProfile:
+    """
+    running response latency per (slave, function code)
+
+    the timeout for a pair is the chosen percentile of its last
+    `window` latencies times margin, kept within [min_timeout,
+    max_timeout]. pairs without samples get max_timeout.
+    """
+    def __init__(
+            self,
+            percentile: float = 0.95,
+            margin: float = 1.5,
+            min_timeout: float = 0.01,
+            max_timeout: float = 0.5,
+            window: int = 64
+    ):
+        self.percentile = percentile
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.window = window
+        self._samples = {}
+        self._timeouts = {}
+
+    def observe(self, slave: int, func: int, latency: float):
+        key = (slave, func)
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(latency)
+        self._timeouts.pop(key, None)
+
+    def timeout(self, slave: int, func: int) -> float:
+        key = (slave, func)
+        timeout = self._timeouts.get(key)
+        if timeout is None:
+            samples = self._samples.get(key)
+            if not samples:
+                return self.max_timeout
+            ordered = sorted(samples)
+            idx = min(
+                math.ceil(self.percentile * len(ordered)) - 1,
+                len(ordered) - 1
+            )
+            timeout = min(
+                max(ordered[max(idx, 0)] * self.margin, self.min_timeout),
+                self.max_timeout
+            )
+            self._timeouts[key] = timeout
+        return timeout
+
+    def save(self, path):
+        data = {
+            f"{slave}:{func}": list(samples)
+            for (slave, func), samples in self._samples.items()
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    def load(self, path):
+        """
+        merge samples saved by save(), a missing file is not an error
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return self
+        for key, samples in data.items():
+            slave, func = (int(v) for v in key.split(":"))
+            for latency in samples:
+                self.observe(slave, func, latency)
+        return self
+
+
+class RetryPolicy:
+    """
+    retries after a failed transaction, waiting backoff, then
+    backoff * factor and so on up to max_backoff
+    """
+    def __init__(
+            self,
+            retries: int = 2,
+            backoff: float = 0.01,
+            factor: float = 2.0,
+            max_backoff: float = 1.0
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.factor = factor
+        self.max_backoff = max_backoff
+
+    def delays(self):
+        delay = self.backoff
+        for _ in range(self.retries):
+            yield min(delay, self.max_backoff)
+            delay *= self.factor
+
+
+class AdaptiveClient:
+    """
+    queries through client with timeouts learned per slave and
+    function code. exception responses are answers and are not
+    retried, other aborts are retried under the retry policy.
+
+    every retry waits retry.factor times longer than the attempt
+    before, up to the profile's max_timeout, and a timeout is fed to
+    the profile as a sample of at least that long. a slave that slows
+    down past the learned timeout is still reached and the estimate
+    follows it up.
+    """
+    def __init__(
+            self,
+            client: ModBusRtuClient,
+            profile: LatencyProfile = None,
+            retry: RetryPolicy = None,
+            sleep=time.sleep
+    ):
+        self.client = client
+        self.profile = LatencyProfile() if profile is None else profile
+        self.retry = RetryPolicy() if retry is None else retry
+        self._sleep = sleep
+
+    def query(self, message: RtuMessage):
+        addr, func = message._addr, message._func
+        profile = self.profile
+        delays = self.retry.delays()
+        timeout = profile.timeout(addr, func)
+        while True:
+            try:
+                self.client.send(message)
+                start = time.perf_counter()
+                resp = self.client.recv(message, timeout)
+            except RtuExceptionResponse:
+                raise
+            except RtuReceiveAbort as e:
+                if isinstance(e, RtuReceiveTimeout):
+                    profile.observe(addr, func, timeout)
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                timeout = min(
+                    timeout * self.retry.factor, profile.max_timeout
+                )
+                continue
+            profile.observe(addr, func, time.perf_counter() - start)
+            return resp
@@ -0,0 +1,135 @@
+import asyncio
+from .base import (
+    RtuMessage, RtuReceiveAbort, RtuReceiveTimeout, RtuExceptionResponse,
+    DATA_BYTE_COUNT_TABLE, MIN_FRAME_INTERVAL, MIN_FRAME_TIMEOUT,
+    EXCEPTION_FLAG, cal_crc
+)
+
+
+class AsyncModBusRtuClient:
+    """
+    asyncio counterpart of ModBusRtuClient
+
+    reader needs read(n) and readexactly(n), writer needs write(data)
+    and drain(), e.g. the StreamReader/StreamWriter pair of any asyncio
+    transport.
+    one event loop can drive as many buses as it has clients.
+    """
+    def __init__(
+            self,
+            reader,
+            writer,
+            frm_time: float = None,
+            crc_enable=True,
+            timeout: float = 0.5
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        if frm_time is None:
+            self._frm_interval = MIN_FRAME_INTERVAL
+            self._frm_timeout = MIN_FRAME_TIMEOUT
+        else:
+            self._frm_interval = 3.5 * frm_time
+            self._frm_timeout = 1.5 * frm_time
+        self._crc_enable = crc_enable
+        self._timeout = timeout
+        self._last_activity = None
+        self._lock = asyncio.Lock()
+
+    async def discard_input(self):
+        """
+        drop what a previous transaction left in the reader, e.g. a
+        reply that came in after its timeout and would otherwise pass
+        as the answer to the next request
+        """
+        read = self._reader.read
+        while True:
+            # a zero timeout fires on the next loop iteration, a read
+            # of buffered bytes returns before that, an empty one waits
+            try:
+                async with asyncio.timeout(0):
+                    if not await read(4096):
+                        return
+            except TimeoutError:
+                return
+
+    async def send(self, message: RtuMessage):
+        msg = message.encode(self._crc_enable)
+        loop = asyncio.get_running_loop()
+        if self._last_activity is not None:
+            gap = self._last_activity + self._frm_interval - loop.time()
+            if gap > 0:
+                await asyncio.sleep(gap)
+        await self.discard_input()
+        self._writer.write(msg)
+        await self._writer.drain()
+        self._last_activity = loop.time()
+        return len(msg)
+
+    async def recv(self, sent: RtuMessage, timeout: float = None):
+        """
+        the whole response has to arrive before the loop deadline,
+        timeout defaults to the one given to the client
+        """
+        loop = asyncio.get_running_loop()
+        if timeout is None:
+            timeout = self._timeout
+        deadline = loop.time() + timeout
+        readexactly = self._reader.readexactly
+        state = "AddrState"
+        try:
+            async with asyncio.timeout_at(deadline):
+                while await readexactly(1) != sent.addr:
+                    pass
+                state = "FuncState"
+                func = await readexactly(1)
+                if func[0] == sent._func | EXCEPTION_FLAG:
+                    state = "ExceptionResponse"
+                    body = await readexactly(3)
+                    if cal_crc(sent.addr + func + body) != 0:
+                        raise RtuReceiveAbort(
+                            "CrcCheck",
+                            "Checking Crc failed, incorrect crc code"
+                        )
+                    raise RtuExceptionResponse(sent._func, body[0])
+                if func != sent.func:
+                    msg = (
+                        f"Unmatch function code: sent is {sent.func.hex()}, "
+                        f"received is {func.hex()}"
+                    )
+                    raise RtuReceiveAbort(state, msg)
+
+                header = sent.addr + func
+                byte_count = DATA_BYTE_COUNT_TABLE[sent._func]
+                if byte_count == "byte_count":
+                    state = "ByteCountState"
+                    count = await readexactly(1)
+                    header += count
+                    byte_count = count[0]
+
+                state = "DataRecvState"
+                body = await readexactly(
+                    byte_count + RtuMessage.BYTE_LEN_PER_CRC
+                )
+        except (TimeoutError, asyncio.IncompleteReadError):
+            raise RtuReceiveTimeout(state, "Receiving timeout")
+        finally:
+            self._last_activity = loop.time()
+
+        recv_msg = RtuMessage()
+        recv_msg.decode(header + body)
+        if not recv_msg.check_crc():
+            raise RtuReceiveAbort(
+                "CrcCheck",
+                "Checking Crc failed, incorrect crc code"
+            )
+        return recv_msg
+
+    async def query(self, message: RtuMessage, timeout: float = None):
+        """
+        send and receive as one transaction, concurrent callers
+        take turns on the bus
+        """
+        async with self._lock:
+            await self.send(message)
+            return await self.recv(message, timeout)
@@ -1,6 +1,7 @@
 import time
 from io import BytesIO
 from enum import Enum
+from .crc import CRC_TABLE, cal_crc
 
 FC_DIAGNOSTICS = 0x08
 FC_GET_COMM_EVT_COUNTER = 0x0B
@@ -12,40 +13,18 @@ MAX_MSG_BYTES = 256
 MIN_FRAME_INTERVAL = 0.00175
 MIN_FRAME_TIMEOUT = 0.00075
 
-CRC_TABLE = [
-    0x0000, 0xC0C1, 0xC181, 0x0140, 0xC301, 0x03C0, 0x0280, 0xC241,
-    0xC601, 0x06C0, 0x0780, 0xC741, 0x0500, 0xC5C1, 0xC481, 0x0440,
-    0xCC01, 0x0CC0, 0x0D80, 0xCD41, 0x0F00, 0xCFC1, 0xCE81, 0x0E40,
-    0x0A00, 0xCAC1, 0xCB81, 0x0B40, 0xC901, 0x09C0, 0x0880, 0xC841,
-    0xD801, 0x18C0, 0x1980, 0xD941, 0x1B00, 0xDBC1, 0xDA81, 0x1A40,
-    0x1E00, 0xDEC1, 0xDF81, 0x1F40, 0xDD01, 0x1DC0, 0x1C80, 0xDC41,
-    0x1400, 0xD4C1, 0xD581, 0x1540, 0xD701, 0x17C0, 0x1680, 0xD641,
-    0xD201, 0x12C0, 0x1380, 0xD341, 0x1100, 0xD1C1, 0xD081, 0x1040,
-    0xF001, 0x30C0, 0x3180, 0xF141, 0x3300, 0xF3C1, 0xF281, 0x3240,
-    0x3600, 0xF6C1, 0xF781, 0x3740, 0xF501, 0x35C0, 0x3480, 0xF441,
-    0x3C00, 0xFCC1, 0xFD81, 0x3D40, 0xFF01, 0x3FC0, 0x3E80, 0xFE41,
-    0xFA01, 0x3AC0, 0x3B80, 0xFB41, 0x3900, 0xF9C1, 0xF881, 0x3840,
-    0x2800, 0xE8C1, 0xE981, 0x2940, 0xEB01, 0x2BC0, 0x2A80, 0xEA41,
-    0xEE01, 0x2EC0, 0x2F80, 0xEF41, 0x2D00, 0xEDC1, 0xEC81, 0x2C40,
-    0xE401, 0x24C0, 0x2580, 0xE541, 0x2700, 0xE7C1, 0xE681, 0x2640,
-    0x2200, 0xE2C1, 0xE381, 0x2340, 0xE101, 0x21C0, 0x2080, 0xE041,
-    0xA001, 0x60C0, 0x6180, 0xA141, 0x6300, 0xA3C1, 0xA281, 0x6240,
-    0x6600, 0xA6C1, 0xA781, 0x6740, 0xA501, 0x65C0, 0x6480, 0xA441,
-    0x6C00, 0xACC1, 0xAD81, 0x6D40, 0xAF01, 0x6FC0, 0x6E80, 0xAE41,
-    0xAA01, 0x6AC0, 0x6B80, 0xAB41, 0x6900, 0xA9C1, 0xA881, 0x6840,
-    0x7800, 0xB8C1, 0xB981, 0x7940, 0xBB01, 0x7BC0, 0x7A80, 0xBA41,
-    0xBE01, 0x7EC0, 0x7F80, 0xBF41, 0x7D00, 0xBDC1, 0xBC81, 0x7C40,
-    0xB401, 0x74C0, 0x7580, 0xB541, 0x7700, 0xB7C1, 0xB681, 0x7640,
-    0x7200, 0xB2C1, 0xB381, 0x7340, 0xB101, 0x71C0, 0x7080, 0xB041,
-    0x5000, 0x90C1, 0x9181, 0x5140, 0x9301, 0x53C0, 0x5280, 0x9241,
-    0x9601, 0x56C0, 0x5780, 0x9741, 0x5500, 0x95C1, 0x9481, 0x5440,
-    0x9C01, 0x5CC0, 0x5D80, 0x9D41, 0x5F00, 0x9FC1, 0x9E81, 0x5E40,
-    0x5A00, 0x9AC1, 0x9B81, 0x5B40, 0x9901, 0x59C0, 0x5880, 0x9841,
-    0x8801, 0x48C0, 0x4980, 0x8941, 0x4B00, 0x8BC1, 0x8A81, 0x4A40,
-    0x4E00, 0x8EC1, 0x8F81, 0x4F40, 0x8D01, 0x4DC0, 0x4C80, 0x8C41,
-    0x4400, 0x84C1, 0x8581, 0x4540, 0x8701, 0x47C0, 0x4680, 0x8641,
-    0x8201, 0x42C0, 0x4380, 0x8341, 0x4100, 0x81C1, 0x8081, 0x4040
-]
+EXCEPTION_FLAG = 0x80
+EXCEPTION_CODES = {
+    0x01: "Illegal function",
+    0x02: "Illegal data address",
+    0x03: "Illegal data value",
+    0x04: "Slave device failure",
+    0x05: "Acknowledge",
+    0x06: "Slave device busy",
+    0x08: "Memory parity error",
+    0x0A: "Gateway path unavailable",
+    0x0B: "Gateway target device failed to respond",
+}
 
 DATA_BYTE_COUNT_TABLE = {
     0x01: "byte_count",
@@ -59,34 +38,40 @@ DATA_BYTE_COUNT_TABLE = {
     0x0F: 4,
     0x10: 4,
     0x11: "byte_count",
-    0x16: 6
+    0x16: 6,
+    0x17: "byte_count"
 }
 
 
-def cal_crc(data):
-
-    crc = 0xffff
-    for b in bytearray(data):
-        temp = b ^ crc & 0xff  # 只取8bit
-        crc = (crc >> 8) ^ CRC_TABLE[temp]
-    return crc
-
-
 class FUNCTION_CODE(Enum):
     READ_COIL_STATUS = 0x01
     READ_INPUT_STATUS = 0x02
+    READ_HOLDING_REGS = 0x03
     WRITE_INPUT_REGS = 0x04
     FORCE_SINGLE_COIL = 0x05
     PRESET_SINGLE_REG = 0x06
     WRITE_MULTI_COILS = 0x0F
     PRESET_MULTI_REGS = 0x10
+    MASK_WRITE_REG = 0x16
+    READ_WRITE_MULTI_REGS = 0x17
+
+
+# single byte objects for addr/func, avoids int.to_bytes per access
+_BYTE = tuple(bytes((i,)) for i in range(256))
 
 
 class RtuMessage:
+    """
+    a decoded message only keeps a reference to the received frame,
+    data_bytes and crc are sliced out of it on first use
+    """
+    __slots__ = ("_addr", "_func", "_data_bytes", "_crc_bytes", "_frame")
+
     _addr: int
     _func: int
     _data_bytes: bytes
     _crc_bytes: bytes
+    _frame: bytes
 
     BYTE_LEN_PER_ADDR = 1
     BYTE_LEN_PER_FUNC = 1
@@ -109,6 +94,7 @@ class RtuMessage:
         self._func = func.value if isinstance(func, FUNCTION_CODE) else func
         self._data_bytes = data_bytes
         self._crc_bytes = b''
+        self._frame = None
         pass
 
     def __str__(self):
@@ -116,34 +102,53 @@ class RtuMessage:
             f"addr: {self.addr}, "
             f"func: {self.func}, "
             f"data_bytes: {self.data_bytes}, "
-            f"crc_bytes: {self._crc_bytes}"
+            f"crc_bytes: {self.crc_bytes}"
         )
 
     def encode(self, crc_enable: bool = True):
-        if crc_enable:
+        """
+        the encoded frame is kept until a field changes,
+        sending the same message again costs no encoding work
+        """
+        if self._frame is None:
             self._crc_bytes = self.calculated_crc_bytes
-        return self.raw + self._crc_bytes
+            self._frame = self.raw + self._crc_bytes
+        elif not isinstance(self._frame, bytes):
+            self._frame = bytes(self._frame)
+        if crc_enable:
+            return self._frame
+        return self._frame[:self.CRC_START_IDX]
 
     def decode(self, raw_message: bytes, crc_enable: bool = True):
-        self.addr = raw_message[self.ADDR_IDX]
-        self.func = raw_message[self.FUNC_IDX]
+        """
+        raw_message may be any buffer (bytes, bytearray, memoryview),
+        it is referenced rather than copied so keep it unchanged
+        while the message is in use
+        """
+        self._addr = raw_message[self.ADDR_IDX]
+        self._func = raw_message[self.FUNC_IDX]
         if crc_enable:
-            self.data_bytes = (
-                raw_message[self.DATA_START_IDX:self.CRC_START_IDX]
-            )
-            self._crc_bytes = raw_message[self.CRC_START_IDX:]
+            self._frame = raw_message
+            self._data_bytes = None
+            self._crc_bytes = None
         else:
-            self.data_bytes = raw_message[self.DATA_START_IDX:]
+            self._frame = None
+            self._data_bytes = raw_message[self.DATA_START_IDX:]
+            self._crc_bytes = b''
 
     def check_crc(self):
-        return self.calculated_crc_bytes == self._crc_bytes
+        if self._data_bytes is None:
+            # a frame ending in its own crc leaves a zero register
+            return cal_crc(self._frame) == 0
+        return self.calculated_crc_bytes == self.crc_bytes
 
     @property
     def addr(self):
-        return self._addr.to_bytes(self.BYTE_LEN_PER_ADDR, self.byteorder)
+        return _BYTE[self._addr]
 
     @addr.setter
     def addr(self, val):
+        self._unpack()
         if isinstance(val, bytes):
             self._addr = int.from_bytes(val, self.byteorder)
         else:
@@ -151,10 +156,11 @@ class RtuMessage:
 
     @property
     def func(self):
-        return self._func.to_bytes(self.BYTE_LEN_PER_FUNC, self.byteorder)
+        return _BYTE[self._func]
 
     @func.setter
     def func(self, val):
+        self._unpack()
         if isinstance(val, bytes):
             self._func = int.from_bytes(val, self.byteorder)
         else:
@@ -162,15 +168,37 @@ class RtuMessage:
 
     @property
     def data_bytes(self):
+        if self._data_bytes is None:
+            self._data_bytes = bytes(self.data_view)
         return self._data_bytes
 
     @data_bytes.setter
     def data_bytes(self, val):
+        self._unpack()
         self._data_bytes = val
 
+    @property
+    def data_view(self):
+        """
+        zero copy view of the data field
+        """
+        if self._data_bytes is None:
+            return memoryview(self._frame)[
+                self.DATA_START_IDX:self.CRC_START_IDX
+            ]
+        return memoryview(self._data_bytes)
+
+    @property
+    def crc_bytes(self):
+        if self._crc_bytes is None:
+            self._crc_bytes = bytes(self._frame[self.CRC_START_IDX:])
+        return self._crc_bytes
+
     @property
     def raw(self):
-        return self.addr + self.func + self.data_bytes
+        if self._data_bytes is None:
+            return bytes(self._frame[:self.CRC_START_IDX])
+        return _BYTE[self._addr] + _BYTE[self._func] + self._data_bytes
 
     @property
     def calculated_crc_bytes(self):
@@ -178,13 +206,24 @@ class RtuMessage:
 
     @property
     def length(self):
+        if self._data_bytes is None:
+            return len(self._frame)
         return (
-            len(self.addr) +
-            len(self.func) +
-            len(self.data_bytes) +
+            self.BYTE_LEN_PER_ADDR +
+            self.BYTE_LEN_PER_FUNC +
+            len(self._data_bytes) +
             len(self._crc_bytes)
         )
 
+    def _unpack(self):
+        """
+        a field is about to change, detach it from the cached frame
+        """
+        if self._data_bytes is None:
+            self._data_bytes = bytes(self.data_view)
+            self._crc_bytes = self.crc_bytes
+        self._frame = None
+
 
 class RtuReceiveAbort(Exception):
     def __init__(self, state, message):
@@ -192,6 +231,7 @@ class RtuReceiveAbort(Exception):
             state_name = state
         else:
             state_name = state.__class__.__name__
+        self.state = state_name
         self.msg = "[{}]{}".format(state_name, message)
         super().__init__(self.msg)
 
@@ -199,6 +239,27 @@ class RtuReceiveAbort(Exception):
         return self.msg
 
 
+class RtuReceiveTimeout(RtuReceiveAbort):
+    """
+    the port went quiet before the frame was complete
+    """
+    pass
+
+
+class RtuExceptionResponse(RtuReceiveAbort):
+    """
+    the slave answered with function code | 0x80 and an exception code
+    """
+    def __init__(self, func: int, exception_code: int):
+        self.func = func
+        self.exception_code = exception_code
+        name = EXCEPTION_CODES.get(exception_code, "Unknown exception")
+        super().__init__(
+            "ExceptionResponse",
+            f"function {func:02x} got exception {exception_code:02x}, {name}"
+        )
+
+
 class RtuReceiveComplete(Exception):
     def __init__(self, *args):
         super().__init__(*args)
@@ -299,8 +360,40 @@ class CrcState(State):
         raise RtuReceiveComplete()
 
 
+def precise_sleep(duration: float, spin: float = 0.002):
+    """
+    time.sleep for all but the last `spin` seconds, then busy wait,
+    sleep alone may overshoot a 1.75 ms gap by a full scheduler tick
+    """
+    end = time.perf_counter() + duration
+    if duration > spin:
+        time.sleep(duration - spin)
+    while time.perf_counter() < end:
+        pass
+
+
 class ModBusRtuClient:
-    def __init__(self, conn, frm_time: float = None, crc_enable=True) -> None:
+    def __init__(
+            self,
+            conn,
+            frm_time: float = None,
+            crc_enable=True,
+            precise_gap: bool = False,
+            response_timeout: float = None,
+            inter_char_timeout: float = None,
+            metrics=None
+    ) -> None:
+        """
+        response_timeout bounds the wait for the first response byte,
+        once a frame started a silence longer than inter_char_timeout
+        (t1.5 by default) ends it. both are pushed down to the port
+        when it has pyserial style timeout/inter_byte_timeout
+        attributes, a zero t1.5 (frm_time=0) leaves the port's own
+        inter_byte_timeout alone. usb adapters deliver bytes in bursts,
+        raise inter_char_timeout to a few ms for them.
+
+        metrics is an optional BusMetrics fed once per transaction.
+        """
         self._conn = conn
         if frm_time is None:
             self._frm_interval = MIN_FRAME_INTERVAL
@@ -308,28 +401,198 @@ class ModBusRtuClient:
         else:
             self._frm_interval = 3.5 * frm_time
             self._frm_timeout = 1.5 * frm_time
+        self._char_time = self._frm_interval / 3.5
+        push_inter_char = inter_char_timeout is not None
+        if inter_char_timeout is None:
+            inter_char_timeout = self._frm_timeout
+            # frm_time=0 means no gap timing, not a zero wait per byte
+            push_inter_char = inter_char_timeout > 0
+        self._response_timeout = response_timeout
+        self._inter_char_timeout = inter_char_timeout
+        if response_timeout is not None and hasattr(conn, "timeout"):
+            conn.timeout = response_timeout
+        self._port_timeout = getattr(conn, "timeout", None)
+        if push_inter_char and hasattr(conn, "inter_byte_timeout"):
+            conn.inter_byte_timeout = inter_char_timeout
         self._crc_enable = crc_enable
+        self._sleep = precise_sleep if precise_gap else time.sleep
+        # perf_counter time the last byte left or reached the port
+        self._last_activity = None
+        self._metrics = metrics
+        self._tx_start = None
+        self._tx_bytes = 0
+        # addr + func + byte count + 255 data bytes + crc
+        self._recv_buf = bytearray(3 + 255 + RtuMessage.BYTE_LEN_PER_CRC)
         pass
 
+    def wait_frame_gap(self):
+        """
+        wait out whatever is left of the 3.5 char silence
+        since the last activity on the bus
+        """
+        if self._last_activity is None:
+            return
+        gap = self._last_activity + self._frm_interval - time.perf_counter()
+        if gap > 0:
+            self._sleep(gap)
+
+    def discard_input(self):
+        """
+        drop whatever a previous transaction left in the port
+        """
+        reset = getattr(self._conn, "reset_input_buffer", None)
+        if reset is not None:
+            reset()
+
     def send(self, message: RtuMessage):
         msg = message.encode(self._crc_enable)
-        time.sleep(self._frm_interval)
-        return self._conn.write(msg)
-
-    def recv(self, sent: RtuMessage):
-        state = AddrState()
-        recv_raw = BytesIO()
+        self.wait_frame_gap()
+        self.discard_input()
+        if self._metrics is not None:
+            self._tx_start = time.perf_counter()
+            self._tx_bytes = len(msg)
+        written = self._conn.write(msg)
+        # the port may return before the frame is fully on the wire
+        self._last_activity = time.perf_counter() + len(msg) * self._char_time
+        return written
+
+    def _read_into(self, view: memoryview) -> int:
+        """
+        one read for the next part of a started frame. the port gets
+        t1.5 plus the wire time of the part as timeout, so a slave that
+        stops mid-frame is noticed after t1.5 rather than after
+        response_timeout, and a short read ends the frame.
+        """
+        if self._char_time:
+            self._set_port_timeout(
+                self._inter_char_timeout + len(view) * self._char_time
+            )
+        out = self._conn.read(len(view))
+        view[:len(out)] = out
+        return len(out)
+
+    def _set_port_timeout(self, timeout):
+        """
+        only touch the port when the value changes,
+        pyserial reconfigures the device on every assignment
+        """
+        if timeout is None:
+            timeout = self._port_timeout
+        conn = self._conn
+        if hasattr(conn, "timeout") and conn.timeout != timeout:
+            conn.timeout = timeout
+
+    def recv(self, sent: RtuMessage, timeout: float = None):
+        """
+        timeout overrides response_timeout for this response only
+        """
+        try:
+            recv_msg = self._recv(sent, timeout)
+        except Exception as e:
+            self._last_activity = time.perf_counter()
+            if self._metrics is not None:
+                received = 5 if isinstance(e, RtuExceptionResponse) else 0
+                self._record(sent, received, e)
+            raise
+        self._last_activity = time.perf_counter()
+        if self._metrics is not None:
+            self._record(sent, recv_msg.length, None)
+        return recv_msg
+
+    def _record(self, sent: RtuMessage, received: int, error):
+        latency = 0.0
+        if self._tx_start is not None:
+            latency = self._last_activity - self._tx_start
+        self._metrics.on_transaction(
+            sent._addr, sent._func, latency, self._tx_bytes, received, error
+        )
+        self._tx_start = None
+        self._tx_bytes = 0
+
+    def _recv(self, sent: RtuMessage, timeout: float = None):
+        buf = self._recv_buf
+        view = memoryview(buf)
+        read = self._conn.read
+
+        # skip bytes until the slave address shows up,
+        # an empty read means the port timed out without a response
+        addr = sent.addr
+        if timeout is None:
+            timeout = self._response_timeout
+        self._set_port_timeout(timeout)
+        deadline = None
+        if timeout is not None:
+            deadline = time.perf_counter() + timeout
         while True:
-            try:
-                out = self._conn.read()
-                state = state.handle(out, sent, recv_raw)
-                # 暂时未增加1.5 frame time
-            except RtuReceiveComplete:
-                recv_msg = RtuMessage()
-                recv_msg.decode(recv_raw.getvalue())
-                if not recv_msg.check_crc():
-                    raise RtuReceiveAbort(
-                        "CrcCheck",
-                        "Checking Crc failed, incorrect crc code"
-                    )
-                return recv_msg
+            out = read(1)
+            if out == addr:
+                break
+            if len(out) == 0 or (
+                deadline is not None and time.perf_counter() > deadline
+            ):
+                raise RtuReceiveTimeout(
+                    "AddrState", "Waiting response timeout"
+                )
+        buf[RtuMessage.ADDR_IDX] = sent._addr
+
+        if self._read_into(view[1:2]) == 0:
+            raise RtuReceiveTimeout(
+                "FuncState", "Receiving function code timeout"
+            )
+        if buf[RtuMessage.FUNC_IDX] == sent._func | EXCEPTION_FLAG:
+            self._recv_exception(sent, view)
+        if buf[RtuMessage.FUNC_IDX] != sent._func:
+            msg = (
+                f"Unmatch function code: sent is {sent.func.hex()}, "
+                f"received is {bytes(view[1:2]).hex()}"
+            )
+            raise RtuReceiveAbort("FuncState", msg)
+
+        pos = RtuMessage.DATA_START_IDX
+        byte_count = DATA_BYTE_COUNT_TABLE[sent._func]
+        if byte_count == "byte_count":
+            if self._read_into(view[pos:pos + 1]) == 0:
+                raise RtuReceiveTimeout(
+                    "ByteCountState", "Receiving function code timeout"
+                )
+            byte_count = buf[pos]
+            pos += 1
+
+        # data and crc arrive in one bulk read
+        end = pos + byte_count + RtuMessage.BYTE_LEN_PER_CRC
+        got = self._read_into(view[pos:end])
+        if pos + got < end:
+            state = "DataRecvState" if got < byte_count else "CrcState"
+            raise RtuReceiveTimeout(
+                state, "Receiving function code timeout"
+            )
+
+        recv_msg = RtuMessage()
+        recv_msg.decode(bytes(view[:end]))
+        if not recv_msg.check_crc():
+            raise RtuReceiveAbort(
+                "CrcCheck",
+                "Checking Crc failed, incorrect crc code"
+            )
+        return recv_msg
+
+    def _recv_exception(self, sent: RtuMessage, view: memoryview):
+        """
+        exception frames are addr, func | 0x80, code and crc
+        """
+        end = RtuMessage.DATA_START_IDX + 1 + RtuMessage.BYTE_LEN_PER_CRC
+        got = self._read_into(view[RtuMessage.DATA_START_IDX:end])
+        if RtuMessage.DATA_START_IDX + got < end:
+            raise RtuReceiveTimeout(
+                "ExceptionResponse", "Receiving exception code timeout"
+            )
+        if cal_crc(view[:end]) != 0:
+            raise RtuReceiveAbort(
+                "CrcCheck",
+                "Checking Crc failed, incorrect crc code"
+            )
+        raise RtuExceptionResponse(sent._func, view[RtuMessage.DATA_START_IDX])
+
+    def query(self, qry_msg: RtuMessage, timeout: float = None):
+        self.send(qry_msg)
+        return self.recv(qry_msg, timeout)
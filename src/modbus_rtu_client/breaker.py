@@ -0,0 +1,118 @@
+import time
+from .base import (
+    RtuMessage, RtuReceiveAbort, RtuReceiveTimeout, RtuExceptionResponse
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RtuSlaveOffline(RtuReceiveAbort):
+    """
+    raised without touching the bus while a slave's breaker is open
+    """
+    def __init__(self, addr: int, retry_in: float):
+        self.addr = addr
+        self.retry_in = retry_in
+        super().__init__(
+            "CircuitBreaker",
+            f"slave {addr} is offline, next probe in {retry_in:.3f}s"
+        )
+
+
+class SlaveHealth:
+    __slots__ = ("addr", "state", "failures", "probe_interval", "next_probe")
+
+    def __init__(self, addr: int, probe_interval: float):
+        self.addr = addr
+        self.state = CLOSED
+        self.failures = 0
+        self.probe_interval = probe_interval
+        self.next_probe = None
+
+
+class CircuitBreaker:
+    """
+    per slave health tracking around anything with query(message)
+
+    after `threshold` consecutive timeouts a slave's breaker opens and
+    queries to it fail fast with RtuSlaveOffline. once probe_interval
+    passed one query goes through as a probe (half open): an answer
+    closes the breaker, another timeout reopens it with the interval
+    multiplied by factor, up to max_probe_interval. exception
+    responses count as answers, other aborts leave the count alone.
+    listeners are called as listener(addr, old_state, new_state).
+    """
+    def __init__(
+            self,
+            client,
+            threshold: int = 3,
+            probe_interval: float = 5.0,
+            max_probe_interval: float = 60.0,
+            factor: float = 2.0,
+            clock=time.monotonic
+    ):
+        self.client = client
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.factor = factor
+        self._clock = clock
+        self._health = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def health(self, addr: int) -> SlaveHealth:
+        health = self._health.get(addr)
+        if health is None:
+            health = self._health[addr] = SlaveHealth(
+                addr, self.probe_interval
+            )
+        return health
+
+    def state(self, addr: int) -> str:
+        return self.health(addr).state
+
+    def query(self, message: RtuMessage, *args, **kwargs):
+        health = self.health(message._addr)
+        if health.state == OPEN:
+            retry_in = health.next_probe - self._clock()
+            if retry_in > 0:
+                raise RtuSlaveOffline(health.addr, retry_in)
+            self._set_state(health, HALF_OPEN)
+        try:
+            resp = self.client.query(message, *args, **kwargs)
+        except RtuExceptionResponse:
+            self._success(health)
+            raise
+        except RtuReceiveTimeout:
+            self._failure(health)
+            raise
+        self._success(health)
+        return resp
+
+    def _success(self, health: SlaveHealth):
+        health.failures = 0
+        health.probe_interval = self.probe_interval
+        if health.state != CLOSED:
+            self._set_state(health, CLOSED)
+
+    def _failure(self, health: SlaveHealth):
+        health.failures += 1
+        if health.state == HALF_OPEN:
+            health.probe_interval = min(
+                health.probe_interval * self.factor, self.max_probe_interval
+            )
+        elif health.failures < self.threshold:
+            return
+        health.next_probe = self._clock() + health.probe_interval
+        self._set_state(health, OPEN)
+
+    def _set_state(self, health: SlaveHealth, state: str):
+        old = health.state
+        health.state = state
+        for listener in self._listeners:
+            listener(health.addr, old, state)
@@ -0,0 +1,101 @@
+from collections import namedtuple
+from .base import RtuMessage
+from .cmd import register_payload
+
+COILS = "coils"
+DISCRETE_INPUTS = "discrete_inputs"
+INPUT_REGS = "input_regs"
+HOLDING_REGS = "holding_regs"
+
+BIT_TABLES = (COILS, DISCRETE_INPUTS)
+
+Change = namedtuple("Change", "slave table address old new")
+
+
+class SnapshotStore:
+    """
+    last payload per (slave, table, start address), update() returns
+    only the points that differ from it
+
+    identical payloads are recognised with one bytes comparison and
+    nothing is decoded. otherwise the old and new payloads are xor'ed
+    as two big integers and only the differing words (or bits) are
+    looked at. register points with a deadband report a change once
+    they moved more than the band away from the last reported value.
+    the first payload of a block reports every point with old=None.
+    """
+    def __init__(self, default_deadband: int = 0):
+        self.default_deadband = default_deadband
+        self._snapshots = {}
+        self._deadbands = {}
+        self._reported = {}
+
+    def set_deadband(self, slave: int, table: str, address: int, band: int):
+        self._deadbands[(slave, table, address)] = band
+
+    def changed(self, slave: int, table: str, start: int, payload) -> bool:
+        return self._snapshots.get((slave, table, start)) != payload
+
+    def update(self, slave: int, table: str, start: int, payload):
+        key = (slave, table, start)
+        new = bytes(payload)
+        old = self._snapshots.get(key)
+        if old == new:
+            return []
+        self._snapshots[key] = new
+        if table in BIT_TABLES:
+            return self._bit_changes(slave, table, start, old, new)
+        return self._reg_changes(slave, table, start, old, new)
+
+    def update_response(
+            self, slave: int, table: str, start: int, response: RtuMessage
+    ):
+        return self.update(slave, table, start, register_payload(response))
+
+    def _bit_changes(self, slave, table, start, old, new):
+        if old is None or len(old) != len(new):
+            return [
+                Change(slave, table, start + i, None, bit)
+                for i, bit in enumerate(
+                    new[i >> 3] >> (i & 7) & 1 for i in range(len(new) * 8)
+                )
+            ]
+        diff = int.from_bytes(old, "little") ^ int.from_bytes(new, "little")
+        changes = []
+        while diff:
+            i = (diff & -diff).bit_length() - 1
+            diff &= diff - 1
+            bit = new[i >> 3] >> (i & 7) & 1
+            changes.append(Change(slave, table, start + i, bit ^ 1, bit))
+        return changes
+
+    def _reg_changes(self, slave, table, start, old, new):
+        count = len(new) // 2
+        if old is None or len(old) != len(new):
+            offsets = range(count)
+            old = None
+        else:
+            diff = int.from_bytes(old, "big") ^ int.from_bytes(new, "big")
+            offsets = []
+            while diff:
+                low = ((diff & -diff).bit_length() - 1) // 16
+                diff &= ~(0xffff << (low * 16))
+                offsets.append(count - 1 - low)
+            offsets.reverse()
+
+        changes = []
+        for i in offsets:
+            addr = start + i
+            value = new[2 * i] << 8 | new[2 * i + 1]
+            before = None if old is None else old[2 * i] << 8 | old[2 * i + 1]
+            band = self._deadbands.get(
+                (slave, table, addr), self.default_deadband
+            )
+            if band:
+                reported = self._reported.get((slave, table, addr), before)
+                if reported is not None and abs(value - reported) <= band:
+                    continue
+                self._reported[(slave, table, addr)] = value
+                before = reported
+            changes.append(Change(slave, table, addr, before, value))
+        return changes
@@ -1,12 +1,114 @@
 from .base import RtuMessage, FUNCTION_CODE, RtuResponseError
+import sys
+import threading
+from array import array
 from io import BytesIO
-# from bitarray import bitarray
+from collections import OrderedDict
+from functools import wraps
+from bitarray import bitarray
+
+try:
+    import numpy
+except ImportError:
+    # optional, register decoding falls back to array.array
+    numpy = None
 
 BYTE_ORDER = "big"
 
+# register data types and their array typecodes
+REGISTER_TYPES = {
+    "u2": "H",
+    "i2": "h",
+    "u4": "I",
+    "i4": "i",
+    "f4": "f",
+}
+
+
+class FrameCache:
+    """
+    bounded LRU of encoded request frames (crc included),
+    keyed by (addr, builder name, builder arguments).
+    builders run on any thread, a lock keeps lookups, evictions and
+    the hit/miss counters consistent.
+    """
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, message: RtuMessage):
+        entry = (
+            message._addr,
+            message._func,
+            message.data_bytes,
+            message.encode()
+        )
+        with self._lock:
+            self._frames[key] = entry
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.maxsize:
+                self._frames.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._frames),
+                "maxsize": self.maxsize
+            }
+
+
+FRAME_CACHE = FrameCache()
+
+
+def cached_frame(builder):
+    """
+    every call still returns its own RtuMessage, only the encoded frame
+    is shared, so callers may modify the message they get back
+    """
+    name = builder.__name__
+
+    @wraps(builder)
+    def wrapper(addr, *args, **kwargs):
+        key = (addr, name, args, tuple(sorted(kwargs.items())))
+        entry = FRAME_CACHE.get(key)
+        if entry is None:
+            message = builder(addr, *args, **kwargs)
+            FRAME_CACHE.put(key, message)
+            return message
+        message = RtuMessage(entry[0], entry[1], entry[2])
+        message._frame = entry[3]
+        message._crc_bytes = entry[3][RtuMessage.CRC_START_IDX:]
+        return message
+    return wrapper
+
 
 class Cmd:
     @staticmethod
+    @cached_frame
     def write_do(addr: int, io: int, on_off: bool):
         """
         Field Name                Example(Hex)
@@ -30,6 +132,7 @@ class Cmd:
         )
 
     @staticmethod
+    @cached_frame
     def write_all_do(addr: int, io_num: int, on_off: bool):
         """
         Field Name                 Example(Hex)
@@ -58,20 +161,21 @@ class Cmd:
         )
 
     @staticmethod
-    def read_do(addr: int, do_num: int):
+    @cached_frame
+    def read_do(addr: int, do_num: int, start: int = 0):
         """
         Field Name                 Example(Hex)
 
         Slave Address              01  <- addr
         Function                   01
-        Starting Address Hi        00
-        Starting Address Lo        00
+        Starting Address Hi        00  <- start 高8位
+        Starting Address Lo        00  <- start 低8位
         No. of Points Hi           00
         No. of Points Lo           04  <- do_num
         Error Check (LRC or CRC)   --
         """
         data_bytes = BytesIO()
-        data_bytes.write(b"\x00\x00")
+        data_bytes.write(start.to_bytes(2, BYTE_ORDER))
         data_bytes.write(do_num.to_bytes(2, BYTE_ORDER))
         return RtuMessage(
             addr,
@@ -80,20 +184,21 @@ class Cmd:
         )
 
     @staticmethod
-    def read_di(addr: int, di_num: int):
+    @cached_frame
+    def read_di(addr: int, di_num: int, start: int = 0):
         """
         Field Name                 Example(Hex)
 
         Slave Address              01  <- addr
         Function                   02
-        Starting Address Hi        00
-        Starting Address Lo        00
+        Starting Address Hi        00  <- start 高8位
+        Starting Address Lo        00  <- start 低8位
         No. of Points Hi           00
         No. of Points Lo           04  <- do_num
         Error Check (LRC or CRC)   --
         """
         data_bytes = BytesIO()
-        data_bytes.write(b"\x00\x00")
+        data_bytes.write(start.to_bytes(2, BYTE_ORDER))
         data_bytes.write(di_num.to_bytes(2, BYTE_ORDER))
         return RtuMessage(
             addr,
@@ -102,6 +207,7 @@ class Cmd:
         )
 
     @staticmethod
+    @cached_frame
     def read_ai_info(addr: int, reg_start: int, reg_num: int):
         """
         Field Name                 Example(Hex)
@@ -126,6 +232,30 @@ class Cmd:
         )
 
     @staticmethod
+    @cached_frame
+    def read_ao_info(addr: int, reg_start: int, reg_num: int):
+        """
+        Field Name                 Example(Hex)
+
+        Slave Address              01  <- addr
+        Function                   03
+        Starting Address Hi        00  <- reg_start 高8位
+        Starting Address Lo        00  <- reg_start 低8位
+        No. of Points Hi           00  <- reg_num 高8位
+        No. of Points Lo           04  <- reg_num 低8位
+        Error Check (LRC or CRC)   --
+        """
+        data_bytes = BytesIO()
+        data_bytes.write(reg_start.to_bytes(2, BYTE_ORDER))
+        data_bytes.write(reg_num.to_bytes(2, BYTE_ORDER))
+        return RtuMessage(
+            addr,
+            FUNCTION_CODE.READ_HOLDING_REGS,
+            data_bytes.getvalue()
+        )
+
+    @staticmethod
+    @cached_frame
     def write_single_ao_info(addr: int, reg_start: int, ao: int):
         """
         Field Name                            Example(Hex)
@@ -182,6 +312,87 @@ class Cmd:
             data_bytes.getvalue()
         )
 
+    @staticmethod
+    @cached_frame
+    def mask_write_ao(addr: int, reg: int, and_mask: int, or_mask: int):
+        """
+        the slave stores (current & and_mask) | (or_mask & ~and_mask),
+        one frame instead of a read-modify-write cycle
+
+        Field Name                            Example(Hex)
+
+        Slave Address                         01  <- addr
+        Function                              16
+        Reference Address Hi                  00  <- reg 高8位
+        Reference Address Lo                  04  <- reg 低8位
+        And_Mask Hi                           00  <- and_mask 高8位
+        And_Mask Lo                           F2  <- and_mask 低8位
+        Or_Mask Hi                            00  <- or_mask 高8位
+        Or_Mask Lo                            25  <- or_mask 低8位
+        Error Check (LRC or CRC)              --
+        """
+        data_bytes = BytesIO()
+        data_bytes.write(reg.to_bytes(2, BYTE_ORDER))
+        data_bytes.write(and_mask.to_bytes(2, BYTE_ORDER))
+        data_bytes.write(or_mask.to_bytes(2, BYTE_ORDER))
+        return RtuMessage(
+            addr,
+            FUNCTION_CODE.MASK_WRITE_REG,
+            data_bytes.getvalue()
+        )
+
+    @staticmethod
+    def write_ao_bit(addr: int, reg: int, bit: int, on_off: bool):
+        """
+        set or clear one bit of a holding register with a mask write
+        """
+        mask = 1 << bit
+        return Cmd.mask_write_ao(
+            addr, reg, ~mask & 0xffff, mask if on_off else 0
+        )
+
+    @staticmethod
+    def read_write_multi_ao(
+            addr: int,
+            read_start: int,
+            read_num: int,
+            write_start: int,
+            ao: list
+    ):
+        """
+        the slave writes ao first and then answers the read,
+        a setpoint update and its readback in one transaction
+
+        Field Name                            Example(Hex)
+
+        Slave Address                         01  <- addr
+        Function                              17
+        Read Starting Address Hi              00  <- read_start 高8位
+        Read Starting Address Lo              03  <- read_start 低8位
+        Quantity to Read Hi                   00
+        Quantity to Read Lo                   06  <- read_num
+        Write Starting Address Hi             00  <- write_start 高8位
+        Write Starting Address Lo             0E  <- write_start 低8位
+        Quantity to Write Hi                  00
+        Quantity to Write Lo                  03  <- len(ao)
+        Write Byte Count                      06
+        Write Register Values                 00 FF 00 FF 00 FF  <- ao
+        Error Check (LRC or CRC)              --
+        """
+        data_bytes = BytesIO()
+        data_bytes.write(read_start.to_bytes(2, BYTE_ORDER))
+        data_bytes.write(read_num.to_bytes(2, BYTE_ORDER))
+        data_bytes.write(write_start.to_bytes(2, BYTE_ORDER))
+        data_bytes.write(len(ao).to_bytes(2, BYTE_ORDER))
+        data_bytes.write((len(ao) * 2).to_bytes(byteorder=BYTE_ORDER))
+        for i in ao:
+            data_bytes.write(i.to_bytes(2, BYTE_ORDER))
+        return RtuMessage(
+            addr,
+            FUNCTION_CODE.READ_WRITE_MULTI_REGS,
+            data_bytes.getvalue()
+        )
+
 
 class RespAnalyzer:
     @staticmethod
@@ -217,15 +428,6 @@ class RespAnalyzer:
         if response.data_bytes == b'':
             raise RtuResponseError("write_all_do", "data_bytes is None")
 
-    # @staticmethod
-    # def proc_read_dido(data_bytes):
-    #     val = []
-    #     for d in data_bytes:
-    #         d_bit = bitarray()
-    #         d_bit.frombytes(d)
-    #         val.append(d_bit)
-    #     return val
-
     @staticmethod
     def read_do(response: RtuMessage):
         """
@@ -256,6 +458,35 @@ class RespAnalyzer:
     # def proc_data_pair(hi, lo):
     #     return hi << 8 | lo
 
+    @staticmethod
+    def read_bits(response: RtuMessage, count: int = None):
+        """
+        coil/input payload of a 0x01/0x02 response as a little endian
+        bitarray, bits[i] is point start + i. count drops the padding
+        bits of the last byte.
+        """
+        bits = bitarray(endian="little")
+        bits.frombytes(register_payload(response))
+        if count is not None:
+            del bits[count:]
+        return bits
+
+    @staticmethod
+    def read_bits_batch(responses, count: int):
+        """
+        unpack many responses into one bitarray, row i (response i)
+        is bits[i * count:(i + 1) * count]
+        """
+        bits = bitarray(endian="little")
+        for response in responses:
+            row = RespAnalyzer.read_bits(response, count)
+            if len(row) != count:
+                raise RtuResponseError(
+                    "read_bits_batch", f"response holds {len(row)} bits"
+                )
+            bits += row
+        return bits
+
     @staticmethod
     def read_ai_info(response: RtuMessage):
         """
@@ -273,10 +504,86 @@ class RespAnalyzer:
         Data Lo (Register 30012)	    0A
         Error Check (LRC or CRC)  	    --
         """
-        byte_cnt = response.data_bytes[0]
-        data_bytes = response.data_bytes[1:1 + byte_cnt]
-        val = [hi << 8 | lo for hi, lo in zip(*[iter(data_bytes)]*2)]
-        return val
+        return decode_registers(register_payload(response)).tolist()
+
+    @staticmethod
+    def read_ao_info(response: RtuMessage):
+        """
+        Field Name					    Example(Hex)
+        Slave Address				    01
+        Function					    03
+        Byte Count					    04
+        Data Hi (Register 40108)	    02
+        Data Lo (Register 40108)	    2B
+        Data Hi (Register 40109)	    00
+        Data Lo (Register 40109)	    00
+        Error Check (LRC or CRC)  	    --
+        """
+        return decode_registers(register_payload(response)).tolist()
+
+    @staticmethod
+    def read_write_multi_ao(response: RtuMessage):
+        """
+        registers read back after the write, same layout as 0x03
+
+        Field Name					    Example(Hex)
+        Slave Address				    01
+        Function					    17
+        Byte Count					    0C
+        Read Registers Value	        00 FE 0A CD ...
+        Error Check (LRC or CRC)  	    --
+        """
+        return decode_registers(register_payload(response)).tolist()
+
+    @staticmethod
+    def read_registers(
+            response: RtuMessage,
+            dtype: str = "u2",
+            word_swap: bool = False,
+            scale: float = None,
+            offset: float = None
+    ):
+        """
+        register payload of a 0x03/0x04 response, see decode_registers.
+        with numpy installed a read-only ndarray viewing the response
+        buffer (a copy only for word_swap), otherwise an array.array.
+        scale and/or offset give value * scale + offset as float64, in
+        one vectorized pass with numpy.
+        """
+        values = decode_registers(register_payload(response), dtype, word_swap)
+        return scale_registers(values, scale, offset)
+
+    @staticmethod
+    def read_registers_batch(
+            responses,
+            dtype: str = "u2",
+            word_swap: bool = False,
+            scale: float = None,
+            offset: float = None
+    ):
+        """
+        decode same sized responses into one 2-D table, shape
+        (len(responses), values per response). an ndarray with numpy,
+        otherwise a memoryview over an array.array
+        """
+        payloads = [register_payload(r) for r in responses]
+        if not payloads:
+            raise RtuResponseError("read_registers_batch", "no responses")
+        size = len(payloads[0])
+        if any(len(p) != size for p in payloads):
+            raise RtuResponseError(
+                "read_registers_batch", "responses differ in length"
+            )
+        values = scale_registers(
+            decode_registers(b''.join(payloads), dtype, word_swap),
+            scale, offset
+        )
+        if numpy is not None:
+            return values.reshape(len(payloads), -1)
+        rows = len(payloads)
+        return memoryview(values).cast("B").cast(
+            values.typecode, shape=[rows, len(values) // rows]
+        )
 
     @staticmethod
     def write_single_ao_info(response: RtuMessage, *args):
@@ -311,3 +618,99 @@ class RespAnalyzer:
             "starting addr": start,
             "number of regs preset": quantity
         }
+
+    @staticmethod
+    def mask_write_ao(response: RtuMessage):
+        """
+        The normal response is an echo of the query,
+        returned after the register has been written.
+
+        Field Name					    Example(Hex)
+        Slave Address				    01
+        Function					    16
+        Reference Address Hi		    00
+        Reference Address Lo		    04
+        And_Mask Hi					    00
+        And_Mask Lo					    F2
+        Or_Mask Hi					    00
+        Or_Mask Lo					    25
+        Error Check (LRC or CRC)  	    --
+        """
+        data = response.data_bytes
+        if len(data) != 6:
+            raise RtuResponseError("mask_write_ao", "data_bytes is not 6 long")
+        return {
+            "reference addr": int.from_bytes(data[0:2], BYTE_ORDER),
+            "and mask": int.from_bytes(data[2:4], BYTE_ORDER),
+            "or mask": int.from_bytes(data[4:6], BYTE_ORDER)
+        }
+
+
+def register_payload(response: RtuMessage):
+    """
+    data bytes after the byte count, without copying
+    """
+    data = response.data_view
+    return data[1:1 + data[0]]
+
+
+def decode_registers(
+        payload,
+        dtype: str = "u2",
+        word_swap: bool = False,
+        use_numpy: bool = True
+):
+    """
+    big endian registers as dtype (u2, i2, u4, i4 or f4), 32-bit types
+    take the high word first unless word_swap.
+
+    with numpy (and use_numpy) an ndarray of the big endian dtype
+    viewing payload without a copy, word_swap makes one. otherwise an
+    array.array in native order filled in one bulk copy, no python
+    object per value.
+    """
+    typecode = REGISTER_TYPES[dtype]
+    values = array(typecode)
+    if len(payload) % values.itemsize:
+        raise RtuResponseError(
+            "decode_registers",
+            f"{len(payload)} bytes do not make whole {dtype} values"
+        )
+    if numpy is not None and use_numpy:
+        if word_swap and values.itemsize == 4:
+            words = numpy.frombuffer(payload, ">u2").reshape(-1, 2)
+            payload = words[:, ::-1].tobytes()
+        return numpy.frombuffer(payload, ">" + dtype)
+    if word_swap and values.itemsize == 4:
+        words = array("H")
+        words.frombytes(payload)
+        words[0::2], words[1::2] = words[1::2], words[0::2]
+        payload = memoryview(words).cast("B")
+    values.frombytes(payload)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def scale_registers(values, scale: float = None, offset: float = None):
+    """
+    values * scale + offset as float64, values unchanged when neither
+    is given
+    """
+    if scale is None and offset is None:
+        return values
+    if scale is None:
+        scale = 1.0
+    if offset is None:
+        offset = 0.0
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values * scale + offset
+    return array("d", [v * scale + offset for v in values])
+
+
+def iter_points(bits, prefix: str, start: int = 0):
+    """
+    lazily pair bits with point names, ("di_0", 1), ("di_1", 0) ...
+    """
+    for i, bit in enumerate(bits, start):
+        yield f"{prefix}_{i}", bit
@@ -0,0 +1,352 @@
+import socket
+import socketserver
+import struct
+import threading
+import time
+from .base import (
+    RtuMessage, RtuReceiveAbort, RtuReceiveTimeout, RtuExceptionResponse
+)
+from .changes import COILS, DISCRETE_INPUTS, INPUT_REGS, HOLDING_REGS
+
+# wire format, both directions length prefixed:
+#   request:  u16 length, rtu frame with crc
+#   response: u8 status, u16 length, body
+STATUS_OK = 0
+STATUS_EXCEPTION = 1
+STATUS_TIMEOUT = 2
+STATUS_ABORT = 3
+
+# addr, func and crc
+MIN_FRAME_BYTES = 4
+
+_HEADER = struct.Struct(">BH")
+_LENGTH = struct.Struct(">H")
+
+READ_TABLES = {
+    0x01: COILS,
+    0x02: DISCRETE_INPUTS,
+    0x03: HOLDING_REGS,
+    0x04: INPUT_REGS,
+}
+
+# func -> (table, multiple, offset of the written range in the data),
+# single writes touch one address
+WRITE_TABLES = {
+    0x05: (COILS, False, 0),
+    0x06: (HOLDING_REGS, False, 0),
+    0x0F: (COILS, True, 0),
+    0x10: (HOLDING_REGS, True, 0),
+    0x16: (HOLDING_REGS, False, 0),
+    0x17: (HOLDING_REGS, True, 4),
+}
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("gateway connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _range(data: bytes, multiple: bool, offset: int = 0):
+    start = int.from_bytes(data[offset:offset + 2], "big")
+    if not multiple:
+        return start, start + 1
+    count = int.from_bytes(data[offset + 2:offset + 4], "big")
+    return start, start + count
+
+
+class _Pending:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class BusGateway:
+    """
+    owns a client (anything with query(message) and send(message)) and
+    serves raw rtu frames to other processes over a unix socket
+
+    reads (0x01-0x04) go through a read-through cache keyed by the
+    request frame and live for ttl seconds, expired entries go as new
+    ones come in and at most cache_size are kept. a read already on the
+    bus is shared by everyone asking for the same frame meanwhile. writes
+    drop cached reads of the same slave and table whose address range
+    overlaps, broadcasts (address 0) are sent without waiting and drop
+    the range on every slave. anything else is passed through. errors
+    other than exception responses and timeouts, a port failure or a
+    request too short to be a frame, come back as aborts.
+    """
+    def __init__(self, client, path: str, ttl: float = 0.5,
+                 clock=time.monotonic, cache_size: int = 1024):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._clock = clock
+        self._bus_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # frame -> (expires, addr, table, start, end, response), in
+        # insertion order which with one ttl is also expiry order
+        self._cache = {}
+        self._inflight = {}
+        # (addr, table) -> writes seen, address 0 counts broadcasts
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.transactions = 0
+        self._server = None
+        self._thread = None
+
+    def _bus(self, message: RtuMessage, broadcast: bool = False):
+        with self._bus_lock:
+            self.transactions += 1
+            if broadcast:
+                self.client.send(message)
+                return None
+            return self.client.query(message)
+
+    def _read(self, frame: bytes, message: RtuMessage, table: str):
+        with self._lock:
+            entry = self._cache.get(frame)
+            if entry is not None and entry[0] > self._clock():
+                self.hits += 1
+                return entry[5]
+            pending = self._inflight.get(frame)
+            owner = pending is None
+            if owner:
+                self.misses += 1
+                pending = self._inflight[frame] = _Pending()
+                generation = self._generation(frame[0], table)
+            else:
+                self.coalesced += 1
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.response
+
+        try:
+            pending.response = self._bus(message).encode()
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[frame]
+                # a write that ran after this read on the bus may have
+                # invalidated before the result got here
+                if (
+                    pending.error is None and self.ttl > 0
+                    and self._generation(frame[0], table) == generation
+                ):
+                    start, end = _range(message.data_view, True)
+                    self._store(frame, (
+                        self._clock() + self.ttl, frame[0], table,
+                        start, end, pending.response
+                    ))
+            pending.done.set()
+        return pending.response
+
+    def _store(self, frame: bytes, entry):
+        cache = self._cache
+        # re-inserted at the end to keep the expiry order
+        cache.pop(frame, None)
+        now = self._clock()
+        while cache:
+            oldest = next(iter(cache))
+            if cache[oldest][0] > now and len(cache) < self.cache_size:
+                break
+            del cache[oldest]
+        cache[frame] = entry
+
+    def _generation(self, addr: int, table: str):
+        generations = self._generations
+        return (
+            generations.get((addr, table), 0),
+            generations.get((0, table), 0)
+        )
+
+    def invalidate(self, addr: int, table: str, start: int, end: int):
+        with self._lock:
+            key = (addr, table)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            stale = [
+                frame for frame, e in self._cache.items()
+                if (addr == 0 or e[1] == addr) and e[2] == table
+                and e[3] < end and start < e[4]
+            ]
+            for frame in stale:
+                del self._cache[frame]
+
+    def handle(self, frame: bytes) -> bytes:
+        """
+        answer one request frame, returns the response frame or b''
+        for a broadcast
+        """
+        if len(frame) < MIN_FRAME_BYTES:
+            raise RtuReceiveAbort("Gateway", "request is too short")
+        message = RtuMessage()
+        message.decode(frame)
+        if not message.check_crc():
+            raise RtuReceiveAbort("Gateway", "request failed crc check")
+        addr, func = frame[0], frame[1]
+        table = READ_TABLES.get(func)
+        if table is not None and addr != 0:
+            return self._read(frame, message, table)
+
+        write = WRITE_TABLES.get(func)
+        try:
+            response = self._bus(message, addr == 0)
+        finally:
+            # invalidate even if the answer got lost, the write may have
+            # reached the slave anyway
+            if write is not None:
+                table, multiple, offset = write
+                start, end = _range(message.data_view, multiple, offset)
+                self.invalidate(addr, table, start, end)
+        return b'' if response is None else response.encode()
+
+    def _serve_request(self, frame: bytes):
+        try:
+            return STATUS_OK, self.handle(frame)
+        except RtuExceptionResponse as e:
+            return STATUS_EXCEPTION, bytes((e.func, e.exception_code))
+        except RtuReceiveAbort as e:
+            if isinstance(e, RtuReceiveTimeout):
+                status = STATUS_TIMEOUT
+            else:
+                status = STATUS_ABORT
+            # "[state]message" -> state, message
+            message = e.msg[len(e.state) + 2:]
+            return status, f"{e.state}\n{message}".encode()
+        except Exception as e:
+            # a port error or a function the client cannot frame, the
+            # caller gets an abort rather than a dropped connection
+            return STATUS_ABORT, f"{type(e).__name__}\n{e}".encode()
+
+    def start(self):
+        """
+        bind the socket and serve from a background thread
+        """
+        gateway = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                try:
+                    while True:
+                        size, = _LENGTH.unpack(_recv_exact(sock, 2))
+                        frame = _recv_exact(sock, size)
+                        status, body = gateway._serve_request(frame)
+                        sock.sendall(
+                            _HEADER.pack(status, len(body)) + body
+                        )
+                except ConnectionError:
+                    pass
+
+        self._server = socketserver.ThreadingUnixStreamServer(
+            self.path, Handler
+        )
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        self._thread.join()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class GatewayClient:
+    """
+    drop-in for ModBusRtuClient.query() in processes that share a bus
+    through a BusGateway
+
+    a reply that does not arrive within timeout raises RtuReceiveTimeout.
+    after that or any other failure the connection is closed, a late
+    reply must not be taken for the next answer, and the next query
+    connects again.
+    """
+    def __init__(self, path: str, timeout: float = None):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._connect()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        return sock
+
+    def _transact(self, frame: bytes):
+        sock = self._sock or self._connect()
+        try:
+            sock.sendall(_LENGTH.pack(len(frame)) + frame)
+            status, size = _HEADER.unpack(_recv_exact(sock, 3))
+            return status, _recv_exact(sock, size)
+        except OSError as e:
+            sock.close()
+            self._sock = None
+            if isinstance(e, socket.timeout):
+                raise RtuReceiveTimeout(
+                    "GatewayClient", f"no answer within {self.timeout}s"
+                ) from None
+            raise
+
+    def query(self, qry_msg: RtuMessage):
+        frame = qry_msg.encode()
+        with self._lock:
+            status, body = self._transact(frame)
+        if status == STATUS_OK:
+            if not body:
+                return None
+            response = RtuMessage()
+            response.decode(body)
+            return response
+        if status == STATUS_EXCEPTION:
+            raise RtuExceptionResponse(body[0], body[1])
+        state, message = body.decode().split("\n", 1)
+        if status == STATUS_TIMEOUT:
+            raise RtuReceiveTimeout(state, message)
+        raise RtuReceiveAbort(state, message)
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
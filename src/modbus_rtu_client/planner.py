@@ -0,0 +1,111 @@
+from collections import namedtuple
+from .base import RtuMessage, FUNCTION_CODE
+from .cmd import Cmd, RespAnalyzer
+
+# per frame quantity limits of the protocol
+MAX_READ_QUANTITY = {
+    FUNCTION_CODE.READ_COIL_STATUS.value: 2000,
+    FUNCTION_CODE.READ_INPUT_STATUS.value: 2000,
+    FUNCTION_CODE.READ_HOLDING_REGS.value: 125,
+    FUNCTION_CODE.WRITE_INPUT_REGS.value: 125,
+}
+
+REGISTER_FUNCS = (
+    FUNCTION_CODE.READ_HOLDING_REGS.value,
+    FUNCTION_CODE.WRITE_INPUT_REGS.value,
+)
+
+# a requested range, func is 0x01/0x02 (bits) or 0x03/0x04 (registers)
+ReadPoint = namedtuple("ReadPoint", "slave func start count")
+
+
+def read_point(slave: int, func, start: int, count: int = 1):
+    if isinstance(func, FUNCTION_CODE):
+        func = func.value
+    return ReadPoint(slave, func, start, count)
+
+
+class ReadBlock:
+    """
+    one merged read frame and the points it answers
+    """
+    def __init__(self, slave: int, func: int, start: int, count: int):
+        self.slave = slave
+        self.func = func
+        self.start = start
+        self.count = count
+        self.points = []
+
+    @property
+    def end(self):
+        return self.start + self.count
+
+    @property
+    def message(self) -> RtuMessage:
+        if self.func == FUNCTION_CODE.READ_COIL_STATUS.value:
+            return Cmd.read_do(self.slave, self.count, start=self.start)
+        if self.func == FUNCTION_CODE.READ_INPUT_STATUS.value:
+            return Cmd.read_di(self.slave, self.count, start=self.start)
+        if self.func == FUNCTION_CODE.READ_HOLDING_REGS.value:
+            return Cmd.read_ao_info(self.slave, self.start, self.count)
+        return Cmd.read_ai_info(self.slave, self.start, self.count)
+
+    def split(self, response: RtuMessage):
+        """
+        map every point to its values, register values for 0x03/0x04
+        and 0/1 for 0x01/0x02
+        """
+        if self.func in REGISTER_FUNCS:
+            values = RespAnalyzer.read_ai_info(response)
+        else:
+            values = RespAnalyzer.read_bits(response, self.count).tolist()
+        return {
+            p: values[p.start - self.start:p.start - self.start + p.count]
+            for p in self.points
+        }
+
+
+def plan_reads(points, gap_tolerance: int = 0, limits: dict = None):
+    """
+    merge points of the same slave and function into as few reads as
+    the quantity limits allow. ranges up to gap_tolerance registers
+    (or bits) apart are joined, reading the gap is cheaper than
+    another round trip.
+    """
+    if limits is None:
+        limits = MAX_READ_QUANTITY
+    groups = {}
+    for p in points:
+        if p.count > limits[p.func]:
+            raise ValueError(
+                f"{p} exceeds the {limits[p.func]} points per frame limit"
+            )
+        groups.setdefault((p.slave, p.func), []).append(p)
+
+    blocks = []
+    for (slave, func), group in groups.items():
+        group.sort(key=lambda p: p.start)
+        block = None
+        for p in group:
+            end = p.start + p.count
+            if (
+                block is None or
+                p.start > block.end + gap_tolerance or
+                max(end, block.end) - block.start > limits[func]
+            ):
+                block = ReadBlock(slave, func, p.start, p.count)
+                blocks.append(block)
+            else:
+                block.count = max(end, block.end) - block.start
+            block.points.append(p)
+    return blocks
+
+
+def execute_plan(client, blocks):
+    """
+    run the planned reads on client, returns {point: values}
+    """
+    values = {}
+    for block in blocks:
+        values.update(block.split(client.query(block.message)))
+    return values
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import struct
+from .base import RtuMessage, RtuResponseError
+from .cmd import register_payload
+
+BIT_FUNCS = (0x01, 0x02)
+REG_FUNCS = (0x03, 0x04)
+
+# profile type -> (struct code, registers)
+POINT_TYPES = {
+    "u2": ("H", 1),
+    "i2": ("h", 1),
+    "u4": ("I", 2),
+    "i4": ("i", 2),
+    "f4": ("f", 2),
+}
+
+PLAN_VERSION = 1
+
+
+def profile_hash(profile: dict) -> str:
+    text = json.dumps(profile, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _plan_block(slave: int, block: dict) -> dict:
+    func = block["func"]
+    start = block["start"]
+    count = block["count"]
+    if func not in BIT_FUNCS + REG_FUNCS:
+        raise ValueError(f"block {block['name']}: unsupported func {func}")
+    data = start.to_bytes(2, "big") + count.to_bytes(2, "big")
+    plan = {
+        "name": block["name"],
+        "func": func,
+        "frame": RtuMessage(slave, func, data).encode().hex(),
+        "format": None,
+        "points": [],
+    }
+    if func in BIT_FUNCS:
+        for p in block["points"]:
+            offset = p["offset"]
+            if offset >= count:
+                raise ValueError(f"point {p['name']} is outside its block")
+            plan["points"].append([p["name"], offset >> 3, 1 << (offset & 7)])
+        return plan
+
+    # one struct format covers the whole block, x skips unused bytes
+    fmt = ">"
+    pos = 0
+    for p in sorted(block["points"], key=lambda p: p["offset"]):
+        code, regs = POINT_TYPES[p.get("type", "u2")]
+        offset = p["offset"]
+        if offset < pos or offset + regs > count:
+            raise ValueError(f"point {p['name']} overlaps or is outside")
+        if offset > pos:
+            fmt += f"{(offset - pos) * 2}x"
+        swap = None
+        if p.get("word_swap") and regs == 2:
+            swap, code = code, "4s"
+        fmt += code
+        pos = offset + regs
+        plan["points"].append([
+            p["name"], p.get("scale"), p.get("bias", 0), swap
+        ])
+    plan["format"] = fmt
+    return plan
+
+
+def plan_profile(profile: dict) -> dict:
+    slave = profile["slave"]
+    return {
+        "version": PLAN_VERSION,
+        "hash": profile_hash(profile),
+        "name": profile.get("name"),
+        "blocks": [_plan_block(slave, b) for b in profile["blocks"]],
+    }
+
+
+class CompiledBlock:
+    __slots__ = ("name", "func", "message", "points", "_struct")
+
+    def __init__(self, plan: dict):
+        self.name = plan["name"]
+        self.func = plan["func"]
+        self.message = RtuMessage()
+        self.message.decode(bytes.fromhex(plan["frame"]))
+        self.points = [tuple(p) for p in plan["points"]]
+        self._struct = None
+        if plan["format"] is not None:
+            self._struct = struct.Struct(plan["format"])
+
+    def decode(self, response: RtuMessage) -> dict:
+        payload = register_payload(response)
+        if self._struct is None:
+            return {
+                name: 1 if payload[byte] & mask else 0
+                for name, byte, mask in self.points
+            }
+        if len(payload) < self._struct.size:
+            raise RtuResponseError(self.name, "response is too short")
+        values = self._struct.unpack_from(payload)
+        out = {}
+        for (name, scale, bias, swap), value in zip(self.points, values):
+            if swap is not None:
+                value = struct.unpack(">" + swap, value[2:] + value[:2])[0]
+            if scale is not None:
+                value = value * scale + bias
+            out[name] = value
+        return out
+
+
+class CompiledProfile:
+    """
+    a device profile turned into ready to send request frames and one
+    struct based decoder per block. a profile is a dict (or JSON):
+
+        {"name": "dam0400", "slave": 254, "blocks": [
+            {"name": "info", "func": 4, "start": 1000, "count": 20,
+             "points": [{"name": "addr", "offset": 0, "type": "u2"},
+                        {"name": "temp", "offset": 2, "type": "i2",
+                         "scale": 0.1}]},
+            {"name": "di", "func": 2, "start": 0, "count": 4,
+             "points": [{"name": "di_0", "offset": 0}]}]}
+
+    register point types are u2, i2, u4, i4 and f4, 32-bit points take
+    "word_swap": true, scaled values are value * scale + bias.
+    """
+    def __init__(self, plan: dict):
+        self.hash = plan["hash"]
+        self.name = plan["name"]
+        self.blocks = {b["name"]: CompiledBlock(b) for b in plan["blocks"]}
+
+    def read(self, client, block: str) -> dict:
+        compiled = self.blocks[block]
+        return compiled.decode(client.query(compiled.message))
+
+    def poll(self, client) -> dict:
+        values = {}
+        for compiled in self.blocks.values():
+            values.update(compiled.decode(client.query(compiled.message)))
+        return values
+
+
+def compile_profile(profile, cache_dir: str = None) -> CompiledProfile:
+    """
+    profile is a dict or a path to a JSON file. with cache_dir the
+    plan is stored as <cache_dir>/<profile hash>.json and reused
+    """
+    if isinstance(profile, (str, os.PathLike)):
+        with open(profile) as f:
+            profile = json.load(f)
+    if cache_dir is None:
+        return CompiledProfile(plan_profile(profile))
+
+    path = os.path.join(cache_dir, profile_hash(profile) + ".json")
+    try:
+        with open(path) as f:
+            plan = json.load(f)
+        if plan.get("version") == PLAN_VERSION:
+            return CompiledProfile(plan)
+    except (FileNotFoundError, ValueError):
+        pass
+    plan = plan_profile(profile)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(plan, f)
+    os.replace(tmp, path)
+    return CompiledProfile(plan)
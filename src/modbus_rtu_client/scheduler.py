@@ -0,0 +1,137 @@
+import time
+from .base import ModBusRtuClient, RtuMessage, RtuReceiveAbort
+
+
+class PollJob:
+    """
+    a request polled every period seconds, priority breaks ties
+    between jobs with the same deadline (higher goes first)
+    """
+    def __init__(
+            self,
+            message: RtuMessage,
+            period: float,
+            priority: int = 0,
+            callback=None,
+            name: str = None
+    ):
+        self.message = message
+        self.period = period
+        self.priority = priority
+        self.callback = callback
+        self.name = name or f"{message._addr}:{message._func:02x}"
+        self.next_run = None
+        self.runs = 0
+        self.misses = 0
+        self.errors = 0
+        self.first_run = None
+        self.last_run = None
+
+    @property
+    def deadline(self):
+        return self.next_run + self.period
+
+    @property
+    def achieved_rate(self):
+        # runs on one clock tick (15 ms on windows) have no span yet
+        if self.runs < 2 or self.last_run <= self.first_run:
+            return 0.0
+        return (self.runs - 1) / (self.last_run - self.first_run)
+
+
+class PollScheduler:
+    """
+    earliest deadline first on one bus
+
+    a job is released at next_run and has to complete within one
+    period, due jobs run back to back with only the inter-frame gap
+    that ModBusRtuClient.send keeps between them
+    """
+    def __init__(
+            self,
+            client: ModBusRtuClient,
+            clock=time.monotonic,
+            sleep=time.sleep
+    ):
+        self._client = client
+        self._clock = clock
+        self._sleep = sleep
+        self._jobs = []
+
+    def add(self, job: PollJob):
+        job.next_run = self._clock()
+        self._jobs.append(job)
+        return job
+
+    def remove(self, job: PollJob):
+        self._jobs.remove(job)
+
+    def next_job(self):
+        now = self._clock()
+        due = [j for j in self._jobs if j.next_run <= now]
+        if not due:
+            return None
+        return min(due, key=lambda j: (j.deadline, -j.priority))
+
+    def run_once(self):
+        """
+        run the most urgent due job, returns it or None if nothing is due
+        """
+        job = self.next_job()
+        if job is None:
+            return None
+
+        start = self._clock()
+        try:
+            resp = self._client.query(job.message)
+        except RtuReceiveAbort as e:
+            job.errors += 1
+            resp = e
+        end = self._clock()
+
+        if job.first_run is None:
+            job.first_run = start
+        job.last_run = start
+        job.runs += 1
+        if end > job.deadline:
+            job.misses += 1
+        # fixed rate, but never queue up a backlog of missed releases
+        job.next_run += job.period
+        if job.deadline < end:
+            job.next_run = end
+        if job.callback is not None:
+            job.callback(job, resp)
+        return job
+
+    def run(self, duration: float = None, cycles: int = None):
+        """
+        poll until duration seconds passed or cycles jobs ran
+        """
+        stop = None if duration is None else self._clock() + duration
+        count = 0
+        while self._jobs:
+            if cycles is not None and count >= cycles:
+                break
+            if stop is not None and self._clock() >= stop:
+                break
+            if self.run_once() is not None:
+                count += 1
+                continue
+            wake = min(j.next_run for j in self._jobs)
+            if stop is not None:
+                wake = min(wake, stop)
+            self._sleep(max(wake - self._clock(), 0))
+        return count
+
+    def report(self):
+        return [
+            {
+                "name": j.name,
+                "requested_rate": 1 / j.period,
+                "achieved_rate": j.achieved_rate,
+                "runs": j.runs,
+                "misses": j.misses,
+                "errors": j.errors
+            }
+            for j in self._jobs
+        ]
@@ -0,0 +1,313 @@
+import random
+import time
+from .base import RtuMessage, EXCEPTION_FLAG, cal_crc
+
+BYTE_ORDER = "big"
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+SLAVE_DEVICE_FAILURE = 0x04
+
+
+class SlaveException(Exception):
+    def __init__(self, code):
+        self.code = code
+        super().__init__(code)
+
+
+def _u16(data, idx):
+    return int.from_bytes(data[idx:idx + 2], BYTE_ORDER)
+
+
+def _pack_bits(bits):
+    out = bytearray((len(bits) + 7) // 8)
+    for i, b in enumerate(bits):
+        if b:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+class SimulatedSlave:
+    """
+    in-memory slave with coil, discrete input, input and holding
+    register tables
+
+    faults are drawn per request from rng: crc_error_rate corrupts the
+    crc, exception_rate answers with SLAVE_DEVICE_FAILURE, drop_rate
+    cuts bytes off the end and silence_rate sends nothing at all.
+    force_exception answers the next request with that code once.
+    """
+    def __init__(
+            self,
+            addr: int,
+            size: int = 10000,
+            slave_id: bytes = b'SIM',
+            seed: int = None
+    ):
+        self.addr = addr
+        self.coils = bytearray(size)
+        self.discrete_inputs = bytearray(size)
+        self.input_regs = [0] * size
+        self.holding_regs = [0] * size
+        self.slave_id = slave_id
+        self.exception_status = 0
+        self.event_counter = 0
+        self.crc_error_rate = 0.0
+        self.exception_rate = 0.0
+        self.drop_rate = 0.0
+        self.silence_rate = 0.0
+        self.force_exception = None
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self._handlers = {
+            0x01: self._read_coils,
+            0x02: self._read_discrete_inputs,
+            0x03: self._read_holding_regs,
+            0x04: self._read_input_regs,
+            0x05: self._write_coil,
+            0x06: self._write_reg,
+            0x07: self._read_exception_status,
+            0x0B: self._get_event_counter,
+            0x0F: self._write_coils,
+            0x10: self._write_regs,
+            0x11: self._report_slave_id,
+            0x16: self._mask_write_reg,
+            0x17: self._read_write_regs,
+        }
+
+    def handle(self, frame: bytes):
+        """
+        response frame for a request frame, None when the slave stays
+        silent (bad crc, broadcast or an injected fault)
+        """
+        if len(frame) < 4 or cal_crc(frame) != 0:
+            return None
+        self.requests += 1
+        func = frame[RtuMessage.FUNC_IDX]
+        data = frame[RtuMessage.DATA_START_IDX:RtuMessage.CRC_START_IDX]
+        rng = self.rng
+        if self.silence_rate and rng.random() < self.silence_rate:
+            return None
+
+        code = self.force_exception
+        self.force_exception = None
+        if code is None and self.exception_rate:
+            if rng.random() < self.exception_rate:
+                code = SLAVE_DEVICE_FAILURE
+        if code is None:
+            handler = self._handlers.get(func)
+            if handler is None:
+                code = ILLEGAL_FUNCTION
+            else:
+                try:
+                    body = handler(data)
+                    if func != 0x0B:
+                        self.event_counter += 1
+                except SlaveException as e:
+                    code = e.code
+                except IndexError:
+                    code = ILLEGAL_DATA_VALUE
+        if code is not None:
+            func |= EXCEPTION_FLAG
+            body = bytes((code,))
+
+        if frame[RtuMessage.ADDR_IDX] == 0:
+            return None
+        resp = RtuMessage(self.addr, func, body).encode()
+        if self.crc_error_rate and rng.random() < self.crc_error_rate:
+            resp = resp[:-1] + bytes((resp[-1] ^ 0xff,))
+        if self.drop_rate and rng.random() < self.drop_rate:
+            resp = resp[:-rng.randint(1, len(resp) - 1)]
+        return resp
+
+    def _check_range(self, table, start, count, limit):
+        if not 1 <= count <= limit:
+            raise SlaveException(ILLEGAL_DATA_VALUE)
+        if start + count > len(table):
+            raise SlaveException(ILLEGAL_DATA_ADDRESS)
+
+    def _check_byte_count(self, data, idx, size):
+        # the byte count at data[idx] and what follows it must both
+        # match what the quantity asks for
+        if data[idx] != size or len(data) != idx + 1 + size:
+            raise SlaveException(ILLEGAL_DATA_VALUE)
+
+    def _read_bits(self, table, data):
+        start, count = _u16(data, 0), _u16(data, 2)
+        self._check_range(table, start, count, 2000)
+        packed = _pack_bits(table[start:start + count])
+        return bytes((len(packed),)) + packed
+
+    def _read_regs(self, table, data):
+        start, count = _u16(data, 0), _u16(data, 2)
+        self._check_range(table, start, count, 125)
+        body = bytearray((count * 2,))
+        for v in table[start:start + count]:
+            body += v.to_bytes(2, BYTE_ORDER)
+        return bytes(body)
+
+    def _read_coils(self, data):
+        return self._read_bits(self.coils, data)
+
+    def _read_discrete_inputs(self, data):
+        return self._read_bits(self.discrete_inputs, data)
+
+    def _read_holding_regs(self, data):
+        return self._read_regs(self.holding_regs, data)
+
+    def _read_input_regs(self, data):
+        return self._read_regs(self.input_regs, data)
+
+    def _write_coil(self, data):
+        start, value = _u16(data, 0), _u16(data, 2)
+        self._check_range(self.coils, start, 1, 1)
+        if value not in (0xFF00, 0x0000):
+            raise SlaveException(ILLEGAL_DATA_VALUE)
+        self.coils[start] = value == 0xFF00
+        return bytes(data)
+
+    def _write_reg(self, data):
+        start = _u16(data, 0)
+        self._check_range(self.holding_regs, start, 1, 1)
+        self.holding_regs[start] = _u16(data, 2)
+        return bytes(data)
+
+    def _read_exception_status(self, data):
+        return bytes((self.exception_status,))
+
+    def _get_event_counter(self, data):
+        return b'\x00\x00' + self.event_counter.to_bytes(2, BYTE_ORDER)
+
+    def _write_coils(self, data):
+        start, count = _u16(data, 0), _u16(data, 2)
+        self._check_range(self.coils, start, count, 1968)
+        self._check_byte_count(data, 4, (count + 7) // 8)
+        packed = data[5:]
+        for i in range(count):
+            self.coils[start + i] = packed[i >> 3] >> (i & 7) & 1
+        return bytes(data[:4])
+
+    def _write_regs(self, data):
+        start, count = _u16(data, 0), _u16(data, 2)
+        self._check_range(self.holding_regs, start, count, 123)
+        self._check_byte_count(data, 4, count * 2)
+        for i in range(count):
+            self.holding_regs[start + i] = _u16(data, 5 + i * 2)
+        return bytes(data[:4])
+
+    def _report_slave_id(self, data):
+        body = self.slave_id + b'\xff'
+        return bytes((len(body),)) + body
+
+    def _mask_write_reg(self, data):
+        start = _u16(data, 0)
+        and_mask, or_mask = _u16(data, 2), _u16(data, 4)
+        self._check_range(self.holding_regs, start, 1, 1)
+        cur = self.holding_regs[start]
+        self.holding_regs[start] = (cur & and_mask) | (or_mask & ~and_mask)
+        return bytes(data)
+
+    def _read_write_regs(self, data):
+        write_start, write_count = _u16(data, 4), _u16(data, 6)
+        self._check_range(self.holding_regs, write_start, write_count, 121)
+        # the read range is checked before anything is written
+        read_start, read_count = _u16(data, 0), _u16(data, 2)
+        self._check_range(self.holding_regs, read_start, read_count, 125)
+        self._check_byte_count(data, 8, write_count * 2)
+        for i in range(write_count):
+            self.holding_regs[write_start + i] = _u16(data, 9 + i * 2)
+        return self._read_regs(self.holding_regs, data)
+
+
+class LoopbackConn:
+    """
+    stands in for serial.Serial in front of one or more SimulatedSlaves
+
+    with baudrate set, request and response bytes take their wire time
+    and read() blocks like a real port, bounded by timeout. latency is
+    the slave's turnaround between request and response.
+    """
+    def __init__(
+            self,
+            slaves,
+            baudrate: int = None,
+            latency: float = 0.0,
+            timeout: float = None,
+            bits_per_char: int = 11
+    ):
+        if isinstance(slaves, SimulatedSlave):
+            slaves = [slaves]
+        self.slaves = {s.addr: s for s in slaves}
+        self.char_time = 0.0 if baudrate is None else bits_per_char / baudrate
+        self.latency = latency
+        self.timeout = timeout
+        self.inter_byte_timeout = None
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self._rx = bytearray()
+        self._rx_start = 0.0
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def write(self, data):
+        data = bytes(data)
+        self.bytes_written += len(data)
+        if not data:
+            return 0
+        addr = data[RtuMessage.ADDR_IDX]
+        if addr == 0:
+            # broadcast, every slave acts and none answers
+            for slave in self.slaves.values():
+                slave.handle(data)
+            return len(data)
+        slave = self.slaves.get(addr)
+        resp = None if slave is None else slave.handle(data)
+        if resp:
+            if not self._rx:
+                self._rx_start = (
+                    time.perf_counter() +
+                    len(data) * self.char_time +
+                    self.latency
+                )
+            self._rx += resp
+        return len(data)
+
+    def read(self, size=1):
+        if self.char_time or self.latency:
+            size = self._wait(size)
+        out = bytes(self._rx[:size])
+        del self._rx[:size]
+        self._rx_start += len(out) * self.char_time
+        self.bytes_read += len(out)
+        return out
+
+    def _wait(self, size):
+        """
+        sleep until size bytes arrived or the timeout passed,
+        returns how many arrived
+        """
+        size = min(size, len(self._rx))
+        if size == 0:
+            if self.timeout:
+                time.sleep(self.timeout)
+            return 0
+        now = time.perf_counter()
+        ready = self._rx_start + size * self.char_time
+        deadline = ready
+        if self.timeout is not None:
+            deadline = min(ready, now + self.timeout)
+        if deadline > now:
+            time.sleep(deadline - now)
+            now = deadline
+        if now >= ready:
+            return size
+        if not self.char_time:
+            return 0
+        return max(0, int((now - self._rx_start) / self.char_time))
+
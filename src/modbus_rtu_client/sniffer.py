@@ -0,0 +1,158 @@
+from collections import namedtuple
+from .base import RtuMessage, DATA_BYTE_COUNT_TABLE, EXCEPTION_FLAG
+from .crc import cal_crc
+
+# data field length of requests, same convention as DATA_BYTE_COUNT_TABLE
+# with ("byte_count", n) meaning n fixed bytes followed by a byte count
+REQUEST_BYTE_COUNT_TABLE = {
+    0x01: 4,
+    0x02: 4,
+    0x03: 4,
+    0x04: 4,
+    0x05: 4,
+    0x06: 4,
+    0x07: 0,
+    0x0B: 0,
+    0x0F: ("byte_count", 4),
+    0x10: ("byte_count", 4),
+    0x11: 0,
+    0x16: 6,
+    0x17: ("byte_count", 8)
+}
+
+MIN_FRAME_BYTES = 4
+
+SniffedFrame = namedtuple("SniffedFrame", "timestamp kind message")
+
+
+def _data_len(rule, buf, pos):
+    """
+    data field length under rule, None while the byte count is missing
+    """
+    if rule == "byte_count":
+        rule = ("byte_count", 0)
+    if isinstance(rule, int):
+        return rule
+    idx = pos + RtuMessage.DATA_START_IDX + rule[1]
+    if idx >= len(buf):
+        return None
+    return rule[1] + 1 + buf[idx]
+
+
+class BusSniffer:
+    """
+    passive decoder for a raw byte stream carrying both directions
+
+    frame ends are found by trying the request and response length
+    rules of the function code and keeping the one whose crc checks,
+    bytes that fit no rule are skipped one at a time. with timestamps
+    a silence longer than frame_gap also closes a partial frame.
+    memory stays bounded by one chunk plus one frame.
+    """
+    def __init__(self, frame_gap: float = None):
+        self._frame_gap = frame_gap
+        self._buf = bytearray()
+        self._last_time = None
+        self._last_request = None
+        self.frames = 0
+        self.garbage_bytes = 0
+
+    def feed(self, data, timestamp: float = None):
+        """
+        add received bytes, returns the SniffedFrames they complete
+        """
+        buf = self._buf
+        if (
+            timestamp is not None and
+            self._frame_gap is not None and
+            self._last_time is not None and
+            timestamp - self._last_time > self._frame_gap
+        ):
+            self.garbage_bytes += len(buf)
+            buf.clear()
+        if timestamp is not None:
+            self._last_time = timestamp
+
+        buf += data
+        frames = []
+        pos = 0
+        while len(buf) - pos >= MIN_FRAME_BYTES:
+            length, kind = self._match(buf, pos)
+            if length is None:
+                break
+            if length == 0:
+                pos += 1
+                self.garbage_bytes += 1
+                continue
+            msg = RtuMessage()
+            msg.decode(bytes(buf[pos:pos + length]))
+            pos += length
+            self.frames += 1
+            frames.append(SniffedFrame(timestamp, kind, msg))
+        del buf[:pos]
+        return frames
+
+    def _candidates(self, buf, pos):
+        func = buf[pos + RtuMessage.FUNC_IDX]
+        if func & EXCEPTION_FLAG:
+            yield "response", 1
+            return
+        if func in REQUEST_BYTE_COUNT_TABLE:
+            yield "request", _data_len(
+                REQUEST_BYTE_COUNT_TABLE[func], buf, pos
+            )
+        if func in DATA_BYTE_COUNT_TABLE:
+            yield "response", _data_len(DATA_BYTE_COUNT_TABLE[func], buf, pos)
+
+    def _match(self, buf, pos):
+        """
+        (length, kind) of the frame at pos, (None, None) if more bytes
+        are needed to tell, (0, None) if no frame starts here
+        """
+        avail = len(buf) - pos
+        waiting = False
+        matched = []
+        for kind, data_len in self._candidates(buf, pos):
+            if data_len is None:
+                waiting = True
+                continue
+            length = (
+                RtuMessage.DATA_START_IDX + data_len +
+                RtuMessage.BYTE_LEN_PER_CRC
+            )
+            if length > avail:
+                waiting = True
+            elif cal_crc(buf[pos:pos + length]) == 0:
+                matched.append((length, kind))
+        if not matched:
+            return (None, None) if waiting else (0, None)
+
+        length, kind = matched[0]
+        head = bytes(buf[pos:pos + RtuMessage.DATA_START_IDX])
+        if len(matched) > 1 and matched[1][0] == length:
+            # echo style replies look the same both ways, a frame
+            # right after a request with the same header answers it
+            kind = "response" if head == self._last_request else "request"
+        self._last_request = head if kind == "request" else None
+        return length, kind
+
+
+def sniff(stream, chunk_size: int = 4096, frame_gap: float = None):
+    """
+    stream is a file-like object with read(n) (a capture file or an
+    open serial port) or an iterable of byte chunks or
+    (timestamp, chunk) pairs
+    """
+    sniffer = BusSniffer(frame_gap)
+    if hasattr(stream, "read"):
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield from sniffer.feed(chunk)
+        return
+    for item in stream:
+        if isinstance(item, tuple):
+            yield from sniffer.feed(item[1], item[0])
+        else:
+            yield from sniffer.feed(item)
@@ -0,0 +1,403 @@
+import queue
+import select
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from .base import (
+    RtuMessage, RtuReceiveAbort, RtuReceiveTimeout, RtuExceptionResponse,
+    EXCEPTION_FLAG
+)
+
+# transaction id, protocol id (0), length of unit id + pdu, unit id
+MBAP_HEADER = struct.Struct(">HHHB")
+MODBUS_TCP_PORT = 502
+# unit id + the 253 byte modbus pdu limit
+MAX_MBAP_LENGTH = 254
+
+
+class TcpConn:
+    """
+    pyserial shaped socket for rtu frames tunnelled over tcp, hand it to
+    ModBusRtuClient as conn (frm_time=0 skips the serial gap timing)
+
+    read(size) blocks until size bytes arrived or timeout passed, once
+    data flows a silence of inter_byte_timeout ends the read early. a
+    broken connection is dropped and dialled again on the next write.
+    """
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            timeout: float = 1.0,
+            inter_byte_timeout: float = None,
+            connect_timeout: float = 3.0
+    ):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.inter_byte_timeout = inter_byte_timeout
+        self.connect_timeout = connect_timeout
+        self.reconnects = 0
+        self._dialled = False
+        self._sock = None
+
+    def _connect(self):
+        sock = socket.create_connection(
+            (self.host, self.port), self.connect_timeout
+        )
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self._dialled:
+            self.reconnects += 1
+        self._dialled = True
+        self._sock = sock
+        return sock
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def write(self, data: bytes) -> int:
+        sock = self._sock or self._connect()
+        try:
+            sock.setblocking(True)
+            sock.sendall(data)
+        except OSError:
+            # one redial, a second failure goes to the caller
+            self.close()
+            sock = self._connect()
+            sock.setblocking(True)
+            sock.sendall(data)
+        finally:
+            if self._sock is not None:
+                self._sock.setblocking(False)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if self._sock is None:
+            return b''
+        buf = bytearray()
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        while len(buf) < size:
+            wait = None
+            if deadline is not None:
+                wait = max(0.0, deadline - time.monotonic())
+            if buf and self.inter_byte_timeout is not None:
+                wait = self.inter_byte_timeout
+            readable, _, _ = select.select([self._sock], [], [], wait)
+            if not readable:
+                break
+            try:
+                chunk = self._sock.recv(size - len(buf))
+            except BlockingIOError:
+                continue
+            except OSError:
+                chunk = b''
+            if not chunk:
+                self.close()
+                break
+            buf += chunk
+        return bytes(buf)
+
+    def reset_input_buffer(self):
+        if self._sock is None:
+            return
+        try:
+            while self._sock.recv(4096):
+                pass
+            # orderly shutdown by the peer
+            self.close()
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.close()
+
+    @property
+    def in_waiting(self) -> int:
+        if self._sock is None:
+            return 0
+        readable, _, _ = select.select([self._sock], [], [], 0)
+        return 4096 if readable else 0
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        buf += chunk
+    return bytes(buf)
+
+
+class ModBusTcpClient:
+    """
+    modbus tcp (mbap framing) client taking and returning RtuMessage so
+    Cmd and RespAnalyzer work unchanged, the unit id is the message addr
+
+    submit() returns a Future at once, up to max_inflight requests share
+    the connection and a reader thread matches answers to them by
+    transaction id. when the connection drops every pending request
+    fails with RtuReceiveAbort and the next submit dials again. a
+    request unanswered after timeout fails with RtuReceiveTimeout once
+    a later submit finds it, so a silent unit cannot hold its slot.
+    """
+    def __init__(
+            self,
+            host: str,
+            port: int = MODBUS_TCP_PORT,
+            timeout: float = 1.0,
+            connect_timeout: float = 3.0,
+            max_inflight: int = 16
+    ):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.reconnects = 0
+        self._dialled = False
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+        # one writer at a time, pipelined frames must not interleave
+        self._send_lock = threading.Lock()
+        self._sock = None
+        self._tid = 0
+        # tid -> (future, unit id, function code, deadline)
+        self._pending = {}
+
+    def _connect(self):
+        sock = socket.create_connection(
+            (self.host, self.port), self.connect_timeout
+        )
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(None)
+        if self._dialled:
+            self.reconnects += 1
+        self._dialled = True
+        self._sock = sock
+        threading.Thread(
+            target=self._reader, args=(sock,), daemon=True
+        ).start()
+        return sock
+
+    def _reader(self, sock):
+        try:
+            while True:
+                tid, protocol, length, unit = MBAP_HEADER.unpack(
+                    _recv_exact(sock, MBAP_HEADER.size)
+                )
+                # a bad header leaves the stream out of step, only a new
+                # connection brings it back
+                if protocol != 0 or not 2 <= length <= MAX_MBAP_LENGTH:
+                    raise RtuReceiveAbort(
+                        "MbapHeader",
+                        f"protocol id {protocol}, length {length}"
+                    )
+                pdu = _recv_exact(sock, length - 1)
+                with self._lock:
+                    entry = self._pending.pop(tid, None)
+                if entry is not None:
+                    self._resolve(entry, unit, pdu)
+        except Exception as e:
+            self._drop(sock, e)
+
+    @staticmethod
+    def _answer(entry, unit: int, pdu: bytes):
+        """
+        the response for a pending (future, unit id, func, deadline)
+        entry, or the exception to fail it with
+        """
+        _, sent_unit, sent_func, _ = entry
+        func = pdu[0]
+        if unit != sent_unit:
+            return RtuReceiveAbort(
+                "AddrState", f"sent to unit {sent_unit}, answered by {unit}"
+            )
+        if func == sent_func | EXCEPTION_FLAG:
+            if len(pdu) != 2:
+                return RtuReceiveAbort(
+                    "ExceptionResponse", f"{len(pdu)} byte exception pdu"
+                )
+            return RtuExceptionResponse(sent_func, pdu[1])
+        if func != sent_func:
+            return RtuReceiveAbort(
+                "FuncState",
+                f"Unmatch function code: sent is {sent_func:02x}, "
+                f"received is {func:02x}"
+            )
+        response = RtuMessage()
+        response.decode(bytes((unit,)) + pdu, crc_enable=False)
+        return response
+
+    def _resolve(self, entry, unit: int, pdu: bytes):
+        future = entry[0]
+        # a query that timed out may have cancelled it meanwhile
+        if not future.set_running_or_notify_cancel():
+            return
+        answer = self._answer(entry, unit, pdu)
+        if isinstance(answer, Exception):
+            future.set_exception(answer)
+        else:
+            future.set_result(answer)
+
+    def _drop(self, sock, error):
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            pending, self._pending = self._pending, {}
+        sock.close()
+        for future, _, _, _ in pending.values():
+            if not future.set_running_or_notify_cancel():
+                continue
+            future.set_exception(
+                RtuReceiveAbort("Connection", f"connection lost: {error}")
+            )
+
+    def _expire(self):
+        """
+        fail the pending requests whose deadline passed
+        """
+        now = time.monotonic()
+        with self._lock:
+            overdue = [
+                tid for tid, entry in self._pending.items()
+                if entry[3] is not None and entry[3] <= now
+            ]
+            expired = [self._pending.pop(tid) for tid in overdue]
+        for future, unit, _, _ in expired:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RtuReceiveTimeout(
+                    "TcpClient", f"no answer from unit {unit}"
+                ))
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def submit(self, message: RtuMessage, timeout: float = None) -> Future:
+        """
+        send message and return the Future of its response, timeout
+        (the client's by default) bounds both the wait for a free slot
+        and the life of the request
+        """
+        if timeout is None:
+            timeout = self.timeout
+        raw = message.raw
+        future = Future()
+        self._expire()
+        if not self._slots.acquire(timeout=timeout):
+            # whatever held the slots meanwhile is overdue by now
+            self._expire()
+            if not self._slots.acquire(blocking=False):
+                raise RtuReceiveTimeout(
+                    "TcpClient", f"no free request slot within {timeout}s"
+                )
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            sock = self._sock
+            if sock is None:
+                try:
+                    sock = self._connect()
+                except OSError as e:
+                    future.set_exception(
+                        RtuReceiveAbort("Connection", f"connect failed: {e}")
+                    )
+                    return future
+            self._tid = self._tid % 0xffff + 1
+            tid = self._tid
+            deadline = None
+            if timeout is not None:
+                deadline = time.monotonic() + timeout
+            self._pending[tid] = (future, raw[0], raw[1], deadline)
+        frame = MBAP_HEADER.pack(tid, 0, len(raw), raw[0]) + raw[1:]
+        try:
+            with self._send_lock:
+                sock.sendall(frame)
+        except OSError as e:
+            self._drop(sock, e)
+        return future
+
+    def query(self, qry_msg: RtuMessage, timeout: float = None):
+        if timeout is None:
+            timeout = self.timeout
+        future = self.submit(qry_msg, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            with self._lock:
+                for tid, entry in list(self._pending.items()):
+                    if entry[0] is future:
+                        del self._pending[tid]
+            future.cancel()
+            raise RtuReceiveTimeout(
+                "TcpClient", f"no answer within {timeout}s"
+            ) from None
+
+    def close(self):
+        with self._lock:
+            sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._drop(sock, "closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    up to size clients made by factory() on demand, query() borrows an
+    idle one so as many transactions run at once as there are clients.
+    a client whose query failed with anything but an exception
+    response is closed (when it can be) and replaced on next use.
+    """
+    def __init__(self, factory, size: int = 4):
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def query(self, qry_msg: RtuMessage, timeout: float = None):
+        self._slots.acquire()
+        try:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                client = self._factory()
+            try:
+                if timeout is None:
+                    response = client.query(qry_msg)
+                else:
+                    response = client.query(qry_msg, timeout)
+            except RtuExceptionResponse:
+                self._idle.put(client)
+                raise
+            except Exception:
+                close = getattr(client, "close", None)
+                if close is not None:
+                    close()
+                raise
+            self._idle.put(client)
+            return response
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
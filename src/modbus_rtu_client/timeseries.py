@@ -0,0 +1,166 @@
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from .base import RtuMessage
+from .cmd import REGISTER_TYPES, decode_registers, register_payload
+
+SERIES_MAGIC = b"MBTS"
+SERIES_HEADER = struct.Struct("<4sBcH")
+SERIES_VERSION = 1
+TIMESTAMP = struct.Struct("<d")
+
+
+class RingBuffer:
+    """
+    fixed capacity history of one polled block: a monotonic timestamp
+    and `width` raw values per sample, kept in two flat arrays so a
+    sample costs no python objects. once full the oldest sample is
+    overwritten.
+
+    times()/values() return plain array.array copies ordered oldest
+    first, numpy.frombuffer(values, dtype).reshape(-1, width) wraps
+    them without another copy.
+    """
+    def __init__(self, capacity: int, width: int = 1, dtype: str = "u2"):
+        self.capacity = capacity
+        self.width = width
+        self.dtype = dtype
+        self._typecode = REGISTER_TYPES[dtype]
+        self._times = array("d", [0.0]) * capacity
+        self._values = array(self._typecode, [0]) * (capacity * width)
+        self._head = 0
+        self._count = 0
+        self.sink = None
+
+    def __len__(self):
+        return self._count
+
+    def append(self, values, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if not isinstance(values, array) or values.typecode != self._typecode:
+            values = array(self._typecode, values)
+        if len(values) != self.width:
+            raise ValueError(
+                f"expected {self.width} values, got {len(values)}"
+            )
+        w = self.width
+        i = self._head
+        self._times[i] = timestamp
+        self._values[i * w:(i + 1) * w] = values
+        self._head = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        if self.sink is not None:
+            self.sink.write(timestamp, values)
+
+    def append_response(
+            self,
+            response: RtuMessage,
+            timestamp: float = None,
+            word_swap: bool = False
+    ):
+        """
+        store a 0x03/0x04 response as it came off the bus
+        """
+        payload = register_payload(response)
+        self.append(
+            decode_registers(payload, self.dtype, word_swap, False),
+            timestamp
+        )
+
+    def _split(self):
+        """
+        index where the oldest sample sits
+        """
+        return self._head if self._count == self.capacity else 0
+
+    def times(self):
+        i = self._split()
+        return self._times[i:self._count] + self._times[:i]
+
+    def values(self):
+        i = self._split() * self.width
+        end = self._count * self.width
+        return self._values[i:end] + self._values[:i]
+
+    def window(self, start: float, end: float):
+        """
+        (times, values) of the samples with start <= timestamp <= end
+        """
+        times = self.times()
+        lo = bisect_left(times, start)
+        hi = bisect_right(times, end)
+        return times[lo:hi], self.values()[lo * self.width:hi * self.width]
+
+    def downsample(self, interval: float):
+        """
+        mean of each value per `interval` seconds, bucket times are
+        the bucket starts. returns (times, values) as double arrays.
+        """
+        times = self.times()
+        values = self.values()
+        w = self.width
+        out_times = array("d")
+        out_values = array("d")
+        i = 0
+        while i < len(times):
+            bucket = times[i] - times[i] % interval
+            j = bisect_left(times, bucket + interval, i)
+            n = j - i
+            out_times.append(bucket)
+            out_values.extend(
+                sum(values[k * w + c] for k in range(i, j)) / n
+                for c in range(w)
+            )
+            i = j
+        return out_times, out_values
+
+
+class SeriesWriter:
+    """
+    append-only file of samples: a header (magic, version, typecode,
+    width) then per sample a little endian double timestamp and the
+    values little endian. set it as RingBuffer.sink to stream every
+    sample to disk as it is stored.
+    """
+    def __init__(self, f, width: int, dtype: str = "u2"):
+        self._f = f
+        self.width = width
+        self._typecode = REGISTER_TYPES[dtype]
+        f.write(SERIES_HEADER.pack(
+            SERIES_MAGIC, SERIES_VERSION, self._typecode.encode(), width
+        ))
+
+    def write(self, timestamp: float, values: array):
+        if sys.byteorder == "big":
+            values = array(values.typecode, values)
+            values.byteswap()
+        self._f.write(TIMESTAMP.pack(timestamp))
+        self._f.write(values.tobytes())
+
+    def flush(self):
+        self._f.flush()
+
+
+def read_series(f):
+    """
+    yields (timestamp, values array) from a SeriesWriter file
+    """
+    magic, version, typecode, width = SERIES_HEADER.unpack(
+        f.read(SERIES_HEADER.size)
+    )
+    if magic != SERIES_MAGIC or version != SERIES_VERSION:
+        raise ValueError("not a series file")
+    typecode = typecode.decode()
+    size = array(typecode).itemsize * width
+    while True:
+        record = f.read(TIMESTAMP.size + size)
+        if len(record) < TIMESTAMP.size + size:
+            return
+        values = array(typecode)
+        values.frombytes(record[TIMESTAMP.size:])
+        if sys.byteorder == "big":
+            values.byteswap()
+        yield TIMESTAMP.unpack_from(record)[0], values
@@ -0,0 +1,109 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import Future, as_completed
+from .base import RtuMessage, RtuReceiveAbort
+
+# lower runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# writes jump ahead of polls unless a priority is given
+WRITE_FUNCS = frozenset((0x05, 0x06, 0x0F, 0x10, 0x16, 0x17))
+
+
+class BusWorker:
+    """
+    thread safe front end, one worker thread owns the client and runs
+    queued transactions one at a time
+
+    submit() returns a Future and never touches the bus itself, equal
+    priorities run first come first served. the default priority is
+    PRIORITY_HIGH for writes and PRIORITY_NORMAL for everything else,
+    pass PRIORITY_LOW for bulk polls. a future cancelled before its
+    turn is skipped. close() fails whatever is still queued.
+    """
+    def __init__(self, client, name: str = "modbus-bus-worker"):
+        self.client = client
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            _, _, message, future = self._queue.get()
+            if message is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.client.query(message))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, message: RtuMessage, priority: int = None) -> Future:
+        if priority is None:
+            func = message.raw[RtuMessage.FUNC_IDX]
+            if func in WRITE_FUNCS:
+                priority = PRIORITY_HIGH
+            else:
+                priority = PRIORITY_NORMAL
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("bus worker is closed")
+            self._queue.put((priority, next(self._seq), message, future))
+        return future
+
+    def submit_batch(self, messages, priority: int = None) -> list:
+        """
+        queue messages in order, one future each
+        """
+        return [self.submit(m, priority) for m in messages]
+
+    def stream(self, messages, priority: int = None, timeout: float = None):
+        """
+        submit a batch and yield (index, future) as each one completes,
+        future.result() gives the response or raises its error
+        """
+        futures = self.submit_batch(messages, priority)
+        index = {f: i for i, f in enumerate(futures)}
+        for future in as_completed(futures, timeout):
+            yield index[future], future
+
+    def query(self, message: RtuMessage, priority: int = None,
+              timeout: float = None):
+        return self.submit(message, priority).result(timeout)
+
+    def close(self, wait: bool = True):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # drain what is still waiting, the worker may be mid query
+            pending = []
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._queue.put((float("-inf"), -1, None, None))
+        for _, _, _, future in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(
+                    RtuReceiveAbort("BusWorker", "worker closed")
+                )
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
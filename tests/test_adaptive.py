@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from modbus_rtu_client.adaptive import (
+    LatencyProfile, RetryPolicy, AdaptiveClient
+)
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuReceiveTimeout, RtuExceptionResponse
+)
+from modbus_rtu_client.cmd import Cmd
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+
+class TestLatencyProfile(unittest.TestCase):
+    def test_percentile_with_margin_and_bounds(self):
+        profile = LatencyProfile(
+            percentile=0.9, margin=2, min_timeout=0.005, max_timeout=0.1
+        )
+        self.assertEqual(profile.timeout(1, 3), 0.1)
+        for i in range(1, 11):
+            profile.observe(1, 3, i / 1000)
+        self.assertAlmostEqual(profile.timeout(1, 3), 0.018)
+        profile.observe(2, 3, 0.0001)
+        self.assertEqual(profile.timeout(2, 3), 0.005)
+        profile.observe(3, 3, 1.0)
+        self.assertEqual(profile.timeout(3, 3), 0.1)
+
+    def test_window(self):
+        profile = LatencyProfile(percentile=1.0, margin=1, window=4)
+        profile.observe(1, 3, 0.2)
+        for _ in range(4):
+            profile.observe(1, 3, 0.02)
+        self.assertAlmostEqual(profile.timeout(1, 3), 0.02)
+
+    def test_persist(self):
+        profile = LatencyProfile()
+        profile.observe(1, 4, 0.03)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "latency.json")
+            profile.save(path)
+            loaded = LatencyProfile().load(path)
+            self.assertEqual(loaded.timeout(1, 4), profile.timeout(1, 4))
+            self.assertEqual(
+                LatencyProfile().load(os.path.join(d, "missing.json"))
+                .timeout(1, 4),
+                0.5
+            )
+
+
+class TestAdaptiveClient(unittest.TestCase):
+    def setUp(self):
+        self.slave = SimulatedSlave(1, seed=0)
+        self.conn = LoopbackConn(self.slave, baudrate=115200)
+        self.delays = []
+        self.client = AdaptiveClient(
+            ModBusRtuClient(self.conn),
+            LatencyProfile(min_timeout=0.005, max_timeout=0.05),
+            RetryPolicy(retries=2, backoff=0.01),
+            sleep=self.delays.append
+        )
+
+    def test_learns_and_applies_timeout(self):
+        for _ in range(5):
+            self.client.query(Cmd.read_do(1, 4))
+        learned = self.client.profile.timeout(1, 1)
+        self.assertLess(learned, 0.05)
+        self.slave.silence_rate = 1.0
+        with self.assertRaises(RtuReceiveTimeout):
+            self.client.query(Cmd.read_do(1, 4))
+        # widened twice by the retry factor for the retries
+        self.assertAlmostEqual(self.conn.timeout, min(learned * 4, 0.05))
+        self.assertEqual(self.delays, [0.01, 0.02])
+        self.assertEqual(self.slave.requests, 8)
+
+    def test_follows_a_slowing_slave(self):
+        for _ in range(20):
+            self.client.profile.observe(1, 1, 0.001)
+        self.assertEqual(self.client.profile.timeout(1, 1), 0.005)
+        self.conn.latency = 0.012
+        for _ in range(10):
+            self.client.query(Cmd.read_do(1, 4))
+        self.assertGreater(self.client.profile.timeout(1, 1), 0.012)
+
+    def test_retry_recovers(self):
+        self.slave.silence_rate = 0.5
+        for _ in range(5):
+            try:
+                self.client.query(Cmd.read_do(1, 4))
+            except RtuReceiveTimeout:
+                pass
+        self.assertGreater(len(self.delays), 0)
+
+    def test_exception_not_retried(self):
+        with self.assertRaises(RtuExceptionResponse):
+            self.client.query(Cmd.read_ai_info(1, 20000, 1))
+        self.assertEqual(self.delays, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import unittest
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuReceiveTimeout, RtuExceptionResponse
+)
+from modbus_rtu_client.breaker import (
+    CircuitBreaker, RtuSlaveOffline, CLOSED, OPEN, HALF_OPEN
+)
+from modbus_rtu_client.cmd import Cmd
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.slave = SimulatedSlave(1)
+        self.client = ModBusRtuClient(
+            LoopbackConn([self.slave, SimulatedSlave(2)]), frm_time=0
+        )
+        self.breaker = CircuitBreaker(
+            self.client, threshold=2, probe_interval=1.0,
+            max_probe_interval=3.0, clock=self.clock
+        )
+        self.changes = []
+        self.breaker.add_listener(
+            lambda addr, old, new: self.changes.append((addr, old, new))
+        )
+
+    def fail(self, exc=RtuReceiveTimeout):
+        with self.assertRaises(exc):
+            self.breaker.query(Cmd.read_do(1, 4))
+
+    def test_trip_probe_and_recover(self):
+        self.slave.silence_rate = 1.0
+        self.fail()
+        self.assertEqual(self.breaker.state(1), CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state(1), OPEN)
+
+        requests = self.slave.requests
+        self.fail(RtuSlaveOffline)
+        self.assertEqual(self.slave.requests, requests)
+        # other slaves are unaffected
+        self.breaker.query(Cmd.read_do(2, 4))
+
+        self.clock.now = 1.0
+        self.fail()
+        self.assertEqual(self.breaker.health(1).probe_interval, 2.0)
+        self.clock.now = 2.5
+        self.fail(RtuSlaveOffline)
+
+        self.slave.silence_rate = 0.0
+        self.clock.now = 3.0
+        self.breaker.query(Cmd.read_do(1, 4))
+        self.assertEqual(self.breaker.state(1), CLOSED)
+        self.assertEqual(self.changes, [
+            (1, CLOSED, OPEN),
+            (1, OPEN, HALF_OPEN),
+            (1, HALF_OPEN, OPEN),
+            (1, OPEN, HALF_OPEN),
+            (1, HALF_OPEN, CLOSED),
+        ])
+
+    def test_backoff_capped(self):
+        self.slave.silence_rate = 1.0
+        self.fail()
+        self.fail()
+        for _ in range(4):
+            self.clock.now += self.breaker.health(1).probe_interval
+            self.fail()
+        self.assertEqual(self.breaker.health(1).probe_interval, 3.0)
+
+    def test_exception_response_counts_as_alive(self):
+        self.slave.silence_rate = 1.0
+        self.fail()
+        self.slave.silence_rate = 0.0
+        self.slave.force_exception = 0x04
+        self.fail(RtuExceptionResponse)
+        self.assertEqual(self.breaker.health(1).failures, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import unittest
+from modbus_rtu_client.base import RtuMessage, cal_crc
+from modbus_rtu_client.changes import (
+    SnapshotStore, Change, INPUT_REGS, DISCRETE_INPUTS
+)
+
+
+def regs(*values):
+    return b''.join(v.to_bytes(2, "big") for v in values)
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.store = SnapshotStore()
+
+    def test_first_update_reports_all(self):
+        changes = self.store.update(1, INPUT_REGS, 100, regs(5, 6))
+        self.assertEqual(changes, [
+            Change(1, INPUT_REGS, 100, None, 5),
+            Change(1, INPUT_REGS, 101, None, 6),
+        ])
+
+    def test_only_changed_registers(self):
+        same = regs(1, 2, 3, 4, 5)
+        self.store.update(1, INPUT_REGS, 0, same)
+        self.assertEqual(self.store.update(1, INPUT_REGS, 0, same), [])
+        self.assertFalse(self.store.changed(1, INPUT_REGS, 0, same))
+        changes = self.store.update(1, INPUT_REGS, 0, regs(9, 2, 3, 0x100, 5))
+        self.assertEqual(changes, [
+            Change(1, INPUT_REGS, 0, 1, 9),
+            Change(1, INPUT_REGS, 3, 4, 0x100),
+        ])
+
+    def test_deadband(self):
+        self.store.set_deadband(1, INPUT_REGS, 0, 5)
+        self.store.update(1, INPUT_REGS, 0, regs(100, 0))
+        self.assertEqual(self.store.update(1, INPUT_REGS, 0, regs(103, 0)), [])
+        # creeping is measured from the last reported value
+        changes = self.store.update(1, INPUT_REGS, 0, regs(106, 1))
+        self.assertEqual(changes, [
+            Change(1, INPUT_REGS, 0, 100, 106),
+            Change(1, INPUT_REGS, 1, 0, 1),
+        ])
+
+    def test_bits(self):
+        self.store.update(2, DISCRETE_INPUTS, 0, b'\x01\x00')
+        changes = self.store.update(2, DISCRETE_INPUTS, 0, b'\x02\x80')
+        self.assertEqual(changes, [
+            Change(2, DISCRETE_INPUTS, 0, 1, 0),
+            Change(2, DISCRETE_INPUTS, 1, 0, 1),
+            Change(2, DISCRETE_INPUTS, 15, 0, 1),
+        ])
+
+    def test_update_response(self):
+        raw = b'\x01\x04\x02\x00\x07'
+        resp = RtuMessage()
+        resp.decode(raw + cal_crc(raw).to_bytes(2, "little"))
+        changes = self.store.update_response(1, INPUT_REGS, 10, resp)
+        self.assertEqual(changes, [Change(1, INPUT_REGS, 10, None, 7)])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
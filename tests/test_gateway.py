@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuMessage, RtuReceiveAbort, RtuExceptionResponse,
+    RtuReceiveTimeout
+)
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer
+from modbus_rtu_client.gateway import BusGateway, GatewayClient
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+
+class RawFrame:
+    """
+    sends a frame as is, crc or not
+    """
+    def __init__(self, frame):
+        self.frame = frame
+
+    def encode(self):
+        return self.frame
+
+
+class TestGateway(unittest.TestCase):
+    def setUp(self):
+        self.slave = SimulatedSlave(1)
+        self.conn = LoopbackConn([self.slave], latency=0.02, timeout=0.05)
+        client = ModBusRtuClient(self.conn, frm_time=0)
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "bus.sock")
+        self.gateway = BusGateway(client, path, ttl=60).start()
+        self.client = GatewayClient(path, timeout=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.gateway.close()
+        self.tmp.cleanup()
+
+    def test_read_through_cache(self):
+        self.slave.input_regs[1000:1002] = [7, 8]
+        for _ in range(3):
+            resp = self.client.query(Cmd.read_ai_info(1, 1000, 2))
+            self.assertEqual(RespAnalyzer.read_ai_info(resp), [7, 8])
+        self.assertEqual(self.gateway.transactions, 1)
+        self.assertEqual(self.gateway.hits, 2)
+
+    def test_concurrent_reads_coalesce(self):
+        barrier = threading.Barrier(4)
+        results = []
+
+        def worker():
+            with GatewayClient(self.gateway.path, timeout=2) as client:
+                barrier.wait()
+                resp = client.query(Cmd.read_di(1, 8))
+                results.append(RespAnalyzer.read_di(resp))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [b'\x00'] * 4)
+        self.assertEqual(self.gateway.transactions, 1)
+        self.assertEqual(self.gateway.hits + self.gateway.coalesced, 3)
+
+    def test_write_invalidates_overlap(self):
+        self.client.query(Cmd.read_do(1, 8))
+        self.client.query(Cmd.read_do(1, 4, start=100))
+        self.client.query(Cmd.write_do(1, 2, True))
+        resp = self.client.query(Cmd.read_do(1, 8))
+        self.assertEqual(RespAnalyzer.read_do(resp), b'\x04')
+        self.client.query(Cmd.read_do(1, 4, start=100))
+        # two reads, the write and the re-read of coils 0-7
+        self.assertEqual(self.gateway.transactions, 4)
+
+    def test_cache_is_bounded(self):
+        now = [0.0]
+        gateway = BusGateway(
+            self.gateway.client, self.gateway.path, ttl=1,
+            clock=lambda: now[0], cache_size=3
+        )
+        for start in range(5):
+            gateway.handle(Cmd.read_ai_info(1, start, 1).encode())
+        self.assertEqual(len(gateway._cache), 3)
+        now[0] = 2.0
+        gateway.handle(Cmd.read_ai_info(1, 9, 1).encode())
+        self.assertEqual(len(gateway._cache), 1)
+
+    def test_write_racing_a_read_is_not_cached_over(self):
+        write = Cmd.write_single_ao_info(1, 5, 42)
+        read = Cmd.read_ao_info(1, 5, 1).encode()
+
+        class RacingGateway(BusGateway):
+            def _bus(self, message, broadcast=False):
+                response = super()._bus(message, broadcast)
+                if message.raw[1] == 0x03 and write is not None:
+                    # the write gets the bus between the read's answer
+                    # and the cache insert
+                    self.handle(write.encode())
+                return response
+
+        gateway = RacingGateway(self.gateway.client, None, ttl=60)
+        first = gateway.handle(read)
+        write = None
+        second = gateway.handle(read)
+        self.assertEqual(first[3:5], b'\x00\x00')
+        self.assertEqual(second[3:5], b'\x00\x2a')
+        self.assertEqual(gateway.transactions, 3)
+
+    def test_late_reply_is_not_taken_for_the_next(self):
+        self.slave.holding_regs[0:2] = [10, 11]
+        client = GatewayClient(self.gateway.path, timeout=0.005)
+        with self.assertRaises(RtuReceiveTimeout):
+            client.query(Cmd.read_ao_info(1, 0, 1))
+        client.timeout = 2
+        # the answer to register 0 reaches the old socket meanwhile
+        time.sleep(0.05)
+        resp = client.query(Cmd.read_ao_info(1, 1, 1))
+        self.assertEqual(RespAnalyzer.read_ao_info(resp), [11])
+        client.close()
+
+    def test_errors_are_forwarded(self):
+        with self.assertRaises(RtuExceptionResponse) as ctx:
+            self.client.query(Cmd.read_ai_info(1, 20000, 1))
+        self.assertEqual(ctx.exception.exception_code, 0x02)
+        with self.assertRaises(RtuReceiveTimeout):
+            self.client.query(Cmd.read_ai_info(9, 1000, 1))
+        # no response length for 0x2b, a 3 byte request, a port error
+        self.slave._handlers[0x2b] = lambda data: b'\x0e\x01'
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[KeyError\]"):
+            self.client.query(RtuMessage(1, 0x2b, b'\x0e\x01\x00'))
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[Gateway\]"):
+            self.client.query(RawFrame(b'\x01\x04\x00'))
+        self.conn.write = mock.Mock(side_effect=OSError("port gone"))
+        with self.assertRaisesRegex(RtuReceiveAbort, "port gone"):
+            self.client.query(Cmd.write_do(1, 0, True))
+        # the connection survived all of it
+        del self.conn.write
+        resp = self.client.query(Cmd.read_di(1, 1))
+        self.assertEqual(RespAnalyzer.read_di(resp), b'\x00')
\ No newline at end of file
@@ -0,0 +1,55 @@
+import unittest
+from modbus_rtu_client.base import ModBusRtuClient, RtuReceiveAbort
+from modbus_rtu_client.cmd import Cmd
+from modbus_rtu_client.metrics import BusMetrics
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+
+class TestBusMetrics(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.metrics = BusMetrics(callback=self.events.append)
+        self.slave = SimulatedSlave(1)
+        self.client = ModBusRtuClient(
+            LoopbackConn(self.slave), frm_time=0, metrics=self.metrics
+        )
+
+    def query_failing(self, msg):
+        with self.assertRaises(RtuReceiveAbort):
+            self.client.query(msg)
+
+    def test_counters(self):
+        self.client.query(Cmd.read_ai_info(1, 0, 2))
+        self.client.query(Cmd.write_do(1, 0, True))
+        self.query_failing(Cmd.read_ai_info(1, 9999, 2))
+        self.slave.crc_error_rate = 1.0
+        self.query_failing(Cmd.read_do(1, 4))
+        self.slave.crc_error_rate = 0.0
+        self.query_failing(Cmd.read_do(2, 4))
+
+        snap = self.metrics.snapshot()
+        self.assertEqual(snap["transactions"], 5)
+        self.assertEqual(snap["bytes_sent"], 8 * 5)
+        self.assertEqual(snap["bytes_received"], 9 + 8 + 5 + 0 + 0)
+        self.assertEqual(snap["exception_responses"], 1)
+        self.assertEqual(snap["crc_failures"], 1)
+        self.assertEqual(snap["timeouts"], 1)
+        self.assertEqual(set(snap["latency"]), {"1:04", "1:05"})
+        self.assertEqual(snap["latency"]["1:04"]["count"], 1)
+        self.assertGreater(snap["utilization"], 0)
+
+    def test_callback(self):
+        self.client.query(Cmd.read_do(1, 4))
+        event, = self.events
+        self.assertEqual((event["slave"], event["func"]), (1, 0x01))
+        self.assertIsNone(event["error"])
+        self.assertGreaterEqual(event["latency"], 0)
+
+    def test_disabled(self):
+        client = ModBusRtuClient(LoopbackConn(self.slave), frm_time=0)
+        client.query(Cmd.read_do(1, 4))
+        self.assertIsNone(client._tx_start)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
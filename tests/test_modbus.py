@@ -1,5 +1,44 @@
+import os
+import struct
+import sys
+import threading
+import time
 import unittest
-from modbus_rtu_client.cmd import Cmd
+from array import array
+from unittest import mock
+from modbus_rtu_client import crc
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuMessage, RtuReceiveAbort, RtuExceptionResponse,
+    cal_crc, precise_sleep
+)
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer, FRAME_CACHE, iter_points
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def with_crc(raw):
+    return raw + cal_crc(raw).to_bytes(2, "little")
+
+
+class FakeConn:
+    def __init__(self, rx=b''):
+        self.rx = bytearray(rx)
+        self.tx = bytearray()
+        self.reads = 0
+
+    def read(self, size=1):
+        self.reads += 1
+        out = bytes(self.rx[:size])
+        del self.rx[:size]
+        return out
+
+    def write(self, data):
+        self.tx += data
+        return len(data)
+
 
 class TestCmd(unittest.TestCase):
     def test_write_do(self):
@@ -14,5 +53,412 @@ class TestCmd(unittest.TestCase):
         cmd = Cmd.write_all_do(254, 4, True)
         self.assertEqual(cmd.encode(False), b'\xfe\x0f\x00\x00\x00\x04\x01\xff')
 
+    def test_read_ao_info(self):
+        cmd = Cmd.read_ao_info(17, 107, 3)
+        self.assertEqual(cmd.encode(False), b'\x11\x03\x00\x6b\x00\x03')
+
+    def test_mask_write_ao(self):
+        cmd = Cmd.mask_write_ao(1, 4, 0xf2, 0x25)
+        self.assertEqual(
+            cmd.encode(False), b'\x01\x16\x00\x04\x00\xf2\x00\x25'
+        )
+        cmd = Cmd.write_ao_bit(1, 4, 3, True)
+        self.assertEqual(
+            cmd.encode(False), b'\x01\x16\x00\x04\xff\xf7\x00\x08'
+        )
+        resp = RtuMessage()
+        resp.decode(cmd.encode())
+        self.assertEqual(RespAnalyzer.mask_write_ao(resp), {
+            "reference addr": 4, "and mask": 0xfff7, "or mask": 0x08
+        })
+
+    def test_read_write_multi_ao(self):
+        cmd = Cmd.read_write_multi_ao(1, 3, 6, 14, [0xff, 0xff, 0xff])
+        self.assertEqual(
+            cmd.encode(False),
+            b'\x01\x17\x00\x03\x00\x06\x00\x0e\x00\x03\x06'
+            b'\x00\xff\x00\xff\x00\xff'
+        )
+
+
+class TestRtuMessage(unittest.TestCase):
+    def test_slots(self):
+        self.assertFalse(hasattr(RtuMessage(1, 3), "__dict__"))
+
+    def test_decode_references_buffer(self):
+        buf = bytearray(with_crc(b'\x01\x04\x02\x00\x0a'))
+        msg = RtuMessage()
+        msg.decode(memoryview(buf))
+        self.assertEqual(msg.addr, b'\x01')
+        self.assertEqual(msg.func, b'\x04')
+        self.assertEqual(msg.length, 7)
+        self.assertTrue(msg.check_crc())
+        view = msg.data_view
+        buf[3] = 0xff
+        self.assertEqual(view.tobytes(), b'\x02\xff\x0a')
+        self.assertEqual(msg.encode(), bytes(buf))
+
+    def test_modify_decoded_message(self):
+        msg = RtuMessage()
+        msg.decode(with_crc(b'\x01\x05\x00\x00\xff\x00'))
+        msg.func = 6
+        self.assertEqual(msg.data_bytes, b'\x00\x00\xff\x00')
+        self.assertEqual(msg.encode(), with_crc(b'\x01\x06\x00\x00\xff\x00'))
+
+    def test_decode_without_crc(self):
+        msg = RtuMessage()
+        msg.decode(b'\x01\x05\x00\x00\xff\x00', crc_enable=False)
+        self.assertEqual(msg.data_bytes, b'\x00\x00\xff\x00')
+        self.assertEqual(msg.length, 6)
+
+
+class TestFrameCache(unittest.TestCase):
+    def setUp(self):
+        FRAME_CACHE.clear()
+
+    def test_repeated_build_hits_cache(self):
+        first = Cmd.read_ai_info(254, 1000, 20)
+        second = Cmd.read_ai_info(254, 1000, 20)
+        self.assertEqual(FRAME_CACHE.info()["misses"], 1)
+        self.assertEqual(FRAME_CACHE.info()["hits"], 1)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.encode(), first.encode())
+        self.assertEqual(second.encode(False), b'\xfe\x04\x03\xe8\x00\x14')
+
+    def test_send_reuses_frame(self):
+        conn = FakeConn()
+        client = ModBusRtuClient(conn, frm_time=0)
+        msg = Cmd.read_do(254, 4)
+        client.send(msg)
+        self.assertIs(msg.encode(), msg._frame)
+        self.assertEqual(bytes(conn.tx), with_crc(b'\xfe\x01\x00\x00\x00\x04'))
+
+    def test_modified_message_is_reencoded(self):
+        msg = Cmd.write_do(254, 0, True)
+        msg.addr = 1
+        self.assertEqual(msg.encode(), with_crc(b'\x01\x05\x00\x00\xff\x00'))
+        cached = Cmd.write_do(254, 0, True)
+        self.assertEqual(cached.encode(False), b'\xfe\x05\x00\x00\xff\x00')
+
+    def test_lru_eviction(self):
+        maxsize = FRAME_CACHE.maxsize
+        try:
+            FRAME_CACHE.maxsize = 2
+            for reg in range(3):
+                Cmd.read_ai_info(1, reg, 1)
+            self.assertEqual(len(FRAME_CACHE), 2)
+            Cmd.read_ai_info(1, 0, 1)
+            self.assertEqual(FRAME_CACHE.misses, 4)
+        finally:
+            FRAME_CACHE.maxsize = maxsize
+
+    def test_threads_share_cache(self):
+        maxsize = FRAME_CACHE.maxsize
+        errors = []
+
+        def build():
+            try:
+                for i in range(2000):
+                    Cmd.read_ai_info(1, i % 7, 1)
+            except Exception as e:
+                errors.append(e)
+
+        interval = sys.getswitchinterval()
+        try:
+            FRAME_CACHE.maxsize = 4
+            # switch threads often so races between get and put show up
+            sys.setswitchinterval(1e-6)
+            threads = [threading.Thread(target=build) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(interval)
+            FRAME_CACHE.maxsize = maxsize
+        self.assertEqual(errors, [])
+        info = FRAME_CACHE.info()
+        self.assertEqual(info["hits"] + info["misses"], 8000)
+        self.assertLessEqual(info["size"], 4)
+
+
+class SerialTimeoutConn(FakeConn):
+    """
+    follows pyserial's read rules: wait up to timeout for the first
+    byte, then return early after inter_byte_timeout of silence
+    """
+    def __init__(self, rx=b''):
+        super().__init__(rx)
+        self.timeout = 0.5
+        self.inter_byte_timeout = None
+
+    def read(self, size=1):
+        out = super().read(size)
+        if len(out) < size:
+            if out and self.inter_byte_timeout is not None:
+                time.sleep(self.inter_byte_timeout)
+            elif self.timeout:
+                time.sleep(self.timeout)
+        return out
+
+
+class TestRecv(unittest.TestCase):
+    def test_recv_byte_count_frame(self):
+        resp = with_crc(b'\xfe\x04\x04\x00\x0a\x00\x0b')
+        conn = FakeConn(b'\x00\x11' + resp)
+        client = ModBusRtuClient(conn)
+        msg = client.recv(Cmd.read_ai_info(254, 0, 2))
+        self.assertEqual(msg.data_bytes, b'\x04\x00\x0a\x00\x0b')
+        self.assertTrue(msg.check_crc())
+        # 2 noise bytes + addr, func, byte count, then one bulk read
+        self.assertEqual(conn.reads, 6)
+
+    def test_recv_fixed_length_frame(self):
+        resp = with_crc(b'\xfe\x05\x00\x00\xff\x00')
+        client = ModBusRtuClient(FakeConn(resp))
+        msg = client.recv(Cmd.write_do(254, 0, True))
+        self.assertEqual(msg.raw, resp[:-2])
+
+    def test_recv_unmatch_function_code(self):
+        client = ModBusRtuClient(FakeConn(with_crc(b'\xfe\x03\x00')))
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[FuncState\]"):
+            client.recv(Cmd.write_do(254, 0, True))
+
+    def test_recv_truncated_frame(self):
+        resp = with_crc(b'\xfe\x04\x04\x00\x0a\x00\x0b')
+        client = ModBusRtuClient(FakeConn(resp[:5]))
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[DataRecvState\]"):
+            client.recv(Cmd.read_ai_info(254, 0, 2))
+        client = ModBusRtuClient(FakeConn(resp[:-1]))
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[CrcState\]"):
+            client.recv(Cmd.read_ai_info(254, 0, 2))
+
+    def test_truncated_frame_ends_after_t15(self):
+        resp = with_crc(b'\xfe\x04\x04\x00\x0a\x00\x0b')
+        # cut mid-data, right after the byte count and after the address
+        for cut, state in ((5, "DataRecvState"), (3, "DataRecvState"),
+                           (1, "FuncState")):
+            conn = SerialTimeoutConn(resp[:cut])
+            client = ModBusRtuClient(
+                conn, frm_time=1e-4, response_timeout=0.3
+            )
+            start = time.perf_counter()
+            with self.assertRaisesRegex(RtuReceiveAbort, rf"\[{state}\]"):
+                client.recv(Cmd.read_ai_info(254, 0, 2))
+            self.assertLess(time.perf_counter() - start, 0.05)
+        # a silent slave still gets the whole response timeout
+        start = time.perf_counter()
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[AddrState\]"):
+            client.recv(Cmd.read_ai_info(254, 0, 2))
+        self.assertGreater(time.perf_counter() - start, 0.25)
+
+    def test_recv_no_response(self):
+        client = ModBusRtuClient(FakeConn())
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[AddrState\]"):
+            client.recv(Cmd.write_do(254, 0, True))
+
+    def test_recv_noise_until_deadline(self):
+        conn = FakeConn()
+        conn.read = lambda size=1: b'\x00'
+        client = ModBusRtuClient(conn, response_timeout=0.01)
+        start = time.perf_counter()
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[AddrState\]"):
+            client.recv(Cmd.write_do(254, 0, True))
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_port_timeouts_configured(self):
+        conn = FakeConn()
+        conn.timeout = 0.5
+        conn.inter_byte_timeout = None
+        ModBusRtuClient(conn, frm_time=0.001, response_timeout=0.05)
+        self.assertEqual(conn.timeout, 0.05)
+        self.assertAlmostEqual(conn.inter_byte_timeout, 0.0015)
+
+    def test_recv_exception_response(self):
+        conn = FakeConn(with_crc(b'\xfe\x84\x02'))
+        client = ModBusRtuClient(conn)
+        with self.assertRaises(RtuExceptionResponse) as ctx:
+            client.recv(Cmd.read_ai_info(254, 9999, 1))
+        self.assertEqual(ctx.exception.exception_code, 0x02)
+        self.assertEqual(ctx.exception.func, 0x04)
+        self.assertIsInstance(ctx.exception, RtuReceiveAbort)
+        self.assertEqual(conn.rx, b'')
+
+    def test_send_discards_stale_input(self):
+        conn = FakeConn(b'\x01\x02\x03')
+        conn.reset_input_buffer = conn.rx.clear
+        client = ModBusRtuClient(conn)
+        client.send(Cmd.read_do(254, 4))
+        self.assertEqual(conn.rx, b'')
+
+    def test_recv_bad_crc(self):
+        resp = bytearray(with_crc(b'\xfe\x05\x00\x00\xff\x00'))
+        resp[-1] ^= 0xff
+        client = ModBusRtuClient(FakeConn(resp))
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[CrcCheck\]"):
+            client.recv(Cmd.write_do(254, 0, True))
+
+
+class TestCrc(unittest.TestCase):
+    def test_backends_match_reference(self):
+        for size in (0, 1, 2, 7, 8, 15, 16, 17, 255, 256):
+            data = os.urandom(size)
+            expected = crc.cal_crc_table8(data)
+            self.assertEqual(crc.cal_crc_table16(data), expected)
+            self.assertEqual(
+                crc.cal_crc_table16(memoryview(bytearray(data))), expected
+            )
+
+    def test_big_endian_words(self):
+        data = memoryview(b'\x01\x02\x03\x04')
+        self.assertEqual(crc._le_words(data).tolist(), [0x0201, 0x0403])
+        # the big endian path must pair bytes into words and swap them,
+        # on this host that is the native words byteswapped
+        with mock.patch.object(crc.sys, "byteorder", "big"):
+            words = crc._le_words(data)
+        native = data.cast("H").tolist()
+        self.assertEqual(
+            words.tolist(), [((w & 0xff) << 8) | (w >> 8) for w in native]
+        )
+
+    def test_known_frame(self):
+        # read 4 coils from slave 0xfe
+        self.assertEqual(cal_crc(b'\xfe\x01\x00\x00\x00\x04'), 0xc629)
+
+    def test_check_crc_batch(self):
+        good = with_crc(os.urandom(32))
+        bad = bytearray(good)
+        bad[3] ^= 0x01
+        self.assertEqual(
+            crc.check_crc_batch([good, bytes(bad), b'\x00']),
+            [True, False, False]
+        )
+
+    def test_set_backend(self):
+        try:
+            crc.set_crc_backend("table8")
+            self.assertIs(crc.get_crc_backend(), crc.cal_crc_table8)
+        finally:
+            crc.set_crc_backend("table16")
+
+
+class TestRegisterDecoding(unittest.TestCase):
+    def response(self, payload):
+        msg = RtuMessage()
+        msg.decode(with_crc(b'\x01\x04' + bytes((len(payload),)) + payload))
+        return msg
+
+    def test_read_ai_info(self):
+        resp = self.response(b'\x00\x0a\xff\xfe')
+        self.assertEqual(RespAnalyzer.read_ai_info(resp), [10, 0xfffe])
+
+    def test_16_bit_types(self):
+        resp = self.response(b'\x00\x0a\xff\xfe')
+        values = RespAnalyzer.read_registers(resp)
+        self.assertEqual(values.tolist(), [10, 65534])
+        self.assertEqual(
+            RespAnalyzer.read_registers(resp, "i2").tolist(), [10, -2]
+        )
+
+    def test_32_bit_types(self):
+        payload = struct.pack(">fi", 1.5, -70000)
+        resp = self.response(payload)
+        values = RespAnalyzer.read_registers(resp, "f4")
+        self.assertEqual(values[0], 1.5)
+        self.assertEqual(RespAnalyzer.read_registers(resp, "i4")[1], -70000)
+        swapped = payload[2:4] + payload[0:2] + payload[6:8] + payload[4:6]
+        resp = self.response(swapped)
+        self.assertEqual(
+            RespAnalyzer.read_registers(resp, "u4", word_swap=True).tolist(),
+            list(struct.unpack(">II", payload))
+        )
+
+    def test_batch(self):
+        resps = [self.response(bytes((0, i, 0, i + 1))) for i in range(3)]
+        table = RespAnalyzer.read_registers_batch(resps)
+        self.assertEqual(table.shape, (3, 2))
+        self.assertEqual(table[2, 1], 3)
+        self.assertEqual(table.tolist(), [[0, 1], [1, 2], [2, 3]])
+
+    def test_scale_and_offset(self):
+        resp = self.response(b'\x00\x0a\xff\xfe')
+        values = RespAnalyzer.read_registers(resp, "i2", scale=0.5, offset=1)
+        self.assertEqual(values.tolist(), [6.0, 0.0])
+        resps = [self.response(bytes((0, i, 0, i + 1))) for i in range(2)]
+        table = RespAnalyzer.read_registers_batch(resps, scale=10)
+        self.assertEqual(table.tolist(), [[0.0, 10.0], [10.0, 20.0]])
+
+    def test_without_numpy(self):
+        with mock.patch("modbus_rtu_client.cmd.numpy", None):
+            self.test_16_bit_types()
+            self.test_32_bit_types()
+            self.test_batch()
+            self.test_scale_and_offset()
+            resp = self.response(b'\x00\x0a\xff\xfe')
+            self.assertIsInstance(RespAnalyzer.read_registers(resp), array)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_numpy_views_the_response(self):
+        resp = self.response(b'\x00\x0a\xff\xfe\x00\x01\x00\x02')
+        values = RespAnalyzer.read_registers(resp)
+        self.assertEqual(values.dtype, numpy.dtype(">u2"))
+        self.assertTrue(numpy.shares_memory(values, resp.data_view))
+        swapped = RespAnalyzer.read_registers(resp, "u4", word_swap=True)
+        self.assertEqual(swapped.tolist(), [0xfffe000a, 0x00020001])
+
+
+class TestBitDecoding(unittest.TestCase):
+    def response(self, payload):
+        msg = RtuMessage()
+        msg.decode(with_crc(b'\x01\x02' + bytes((len(payload),)) + payload))
+        return msg
+
+    def test_read_bits(self):
+        resp = self.response(b'\x0f\x01')
+        bits = RespAnalyzer.read_bits(resp, 10)
+        self.assertEqual(bits.tolist(), [1, 1, 1, 1, 0, 0, 0, 0, 1, 0])
+        self.assertEqual(len(RespAnalyzer.read_bits(resp)), 16)
+
+    def test_batch_and_points(self):
+        resps = [self.response(bytes((i,))) for i in (1, 2, 4)]
+        bits = RespAnalyzer.read_bits_batch(resps, 3)
+        self.assertEqual(bits.tolist(), [1, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual(
+            dict(iter_points(bits[3:6], "di", start=8)),
+            {"di_8": 0, "di_9": 1, "di_10": 0}
+        )
+
+
+class TestFrameGap(unittest.TestCase):
+    def test_waits_only_for_remaining_gap(self):
+        msg = Cmd.write_do(1, 0, True)
+        with mock.patch("modbus_rtu_client.base.time.sleep") as sleep:
+            client = ModBusRtuClient(FakeConn(), frm_time=0.01)
+            client.send(msg)
+            sleep.assert_not_called()
+            client.send(msg)
+            # 3.5 chars of silence plus 8 chars still being transmitted
+            self.assertAlmostEqual(sleep.call_args[0][0], 0.115, delta=0.005)
+
+    def test_idle_bus_sends_immediately(self):
+        msg = Cmd.write_do(1, 0, True)
+        conn = FakeConn()
+        with mock.patch("modbus_rtu_client.base.time.sleep") as sleep:
+            client = ModBusRtuClient(conn, frm_time=0.0001)
+            client.send(msg)
+            conn.rx += msg.encode()
+            client.recv(msg)
+            precise_sleep(0.001)
+            client.send(msg)
+            sleep.assert_not_called()
+
+    def test_precise_sleep(self):
+        start = time.perf_counter()
+        precise_sleep(0.003)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.003)
+        client = ModBusRtuClient(FakeConn(), precise_gap=True)
+        self.assertIs(client._sleep, precise_sleep)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
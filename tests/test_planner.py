@@ -0,0 +1,79 @@
+import unittest
+from modbus_rtu_client.base import RtuMessage, FUNCTION_CODE, cal_crc
+from modbus_rtu_client.planner import read_point, plan_reads
+
+AI = FUNCTION_CODE.WRITE_INPUT_REGS
+DI = FUNCTION_CODE.READ_INPUT_STATUS
+AO = FUNCTION_CODE.READ_HOLDING_REGS
+
+
+def response(raw):
+    msg = RtuMessage()
+    msg.decode(raw + cal_crc(raw).to_bytes(2, "little"))
+    return msg
+
+
+class TestPlanReads(unittest.TestCase):
+    def test_adjacent_ranges_merge(self):
+        points = [
+            read_point(1, AI, 10, 2),
+            read_point(1, AI, 0, 4),
+            read_point(1, AI, 4, 2),
+            read_point(2, AI, 0, 1),
+        ]
+        blocks = plan_reads(points)
+        self.assertEqual(
+            [(b.slave, b.start, b.count) for b in blocks],
+            [(1, 0, 6), (1, 10, 2), (2, 0, 1)]
+        )
+        blocks = plan_reads(points, gap_tolerance=4)
+        self.assertEqual(
+            [(b.slave, b.start, b.count) for b in blocks],
+            [(1, 0, 12), (2, 0, 1)]
+        )
+        self.assertEqual(
+            blocks[0].message.encode(False), b'\x01\x04\x00\x00\x00\x0c'
+        )
+
+    def test_quantity_limit(self):
+        points = [read_point(1, AI, i * 50, 50) for i in range(5)]
+        blocks = plan_reads(points)
+        self.assertEqual([b.count for b in blocks], [100, 100, 50])
+        with self.assertRaises(ValueError):
+            plan_reads([read_point(1, AI, 0, 126)])
+
+    def test_split_registers(self):
+        p1 = read_point(1, AI, 0, 1)
+        p2 = read_point(1, AI, 2, 2)
+        block, = plan_reads([p1, p2], gap_tolerance=1)
+        resp = response(b'\x01\x04\x08\x00\x01\x00\x02\x00\x03\x00\x04')
+        self.assertEqual(block.split(resp), {p1: [1], p2: [3, 4]})
+
+    def test_holding_registers(self):
+        p1 = read_point(1, AO, 100, 2)
+        p2 = read_point(1, AI, 100, 2)
+        blocks = plan_reads([p1, p2])
+        self.assertEqual(
+            [b.message.encode(False) for b in blocks],
+            [b'\x01\x03\x00\x64\x00\x02', b'\x01\x04\x00\x64\x00\x02']
+        )
+        resp = response(b'\x01\x03\x04\x00\x07\x00\x08')
+        self.assertEqual(blocks[0].split(resp), {p1: [7, 8]})
+
+    def test_split_bits(self):
+        p1 = read_point(1, DI, 3, 2)
+        p2 = read_point(1, DI, 8, 3)
+        block, = plan_reads([p1, p2], gap_tolerance=8)
+        self.assertEqual(
+            block.message.encode(False), b'\x01\x02\x00\x03\x00\x08'
+        )
+        # inputs 3..10, lsb first
+        resp = response(b'\x01\x02\x01\xa5')
+        self.assertEqual(
+            block.split(resp),
+            {p1: [True, False], p2: [True, False, True]}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
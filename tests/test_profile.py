@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+from modbus_rtu_client.base import ModBusRtuClient
+from modbus_rtu_client.cmd import Cmd
+from modbus_rtu_client.profile import compile_profile, profile_hash
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+DEMO = os.path.join(
+    os.path.dirname(__file__), os.pardir, "demos", "dam0400.json"
+)
+
+PROFILE = {
+    "name": "meter",
+    "slave": 3,
+    "blocks": [
+        {"name": "regs", "func": 3, "start": 100, "count": 8, "points": [
+            {"name": "volts", "offset": 0, "type": "u2", "scale": 0.1},
+            {"name": "temp", "offset": 2, "type": "i2"},
+            {"name": "energy", "offset": 3, "type": "u4"},
+            {"name": "power", "offset": 5, "type": "u4", "word_swap": True},
+        ]},
+        {"name": "alarms", "func": 2, "start": 0, "count": 10, "points": [
+            {"name": "door", "offset": 0},
+            {"name": "fan", "offset": 9},
+        ]},
+    ],
+}
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.slave = SimulatedSlave(3)
+        self.client = ModBusRtuClient(LoopbackConn([self.slave]), frm_time=0)
+
+    def test_poll(self):
+        self.slave.holding_regs[100:107] = [2305, 0, 0xfffe, 1, 2, 3, 4]
+        self.slave.discrete_inputs[9] = 1
+        values = compile_profile(PROFILE).poll(self.client)
+        self.assertAlmostEqual(values.pop("volts"), 230.5)
+        self.assertEqual(values, {
+            "temp": -2, "energy": 0x10002, "power": 0x40003,
+            "door": 0, "fan": 1,
+        })
+
+    def test_frames_match_cmd(self):
+        compiled = compile_profile(DEMO)
+        self.assertEqual(
+            compiled.blocks["info"].message.encode(),
+            Cmd.read_ai_info(254, 1000, 20).encode()
+        )
+        self.assertEqual(
+            compiled.blocks["di"].message.encode(),
+            Cmd.read_di(254, 4).encode()
+        )
+
+    def test_invalid_points(self):
+        bad = json.loads(json.dumps(PROFILE))
+        bad["blocks"][0]["points"][1]["offset"] = 0
+        with self.assertRaises(ValueError):
+            compile_profile(bad)
+        bad["blocks"][0]["func"] = 5
+        with self.assertRaises(ValueError):
+            compile_profile(bad)
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            compile_profile(PROFILE, cache_dir)
+            path = os.path.join(cache_dir, profile_hash(PROFILE) + ".json")
+            with open(path) as f:
+                plan = json.load(f)
+            plan["name"] = "from cache"
+            with open(path, "w") as f:
+                json.dump(plan, f)
+            self.assertEqual(
+                compile_profile(PROFILE, cache_dir).name, "from cache"
+            )
\ No newline at end of file
@@ -0,0 +1,93 @@
+import unittest
+from modbus_rtu_client.base import ModBusRtuClient
+from modbus_rtu_client.cmd import Cmd
+from modbus_rtu_client.scheduler import PollJob, PollScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, t):
+        self.now += t
+
+
+class EchoConn:
+    """
+    answers every write_do request with its echo after `cost` seconds
+    """
+    def __init__(self, clock, cost):
+        self.clock = clock
+        self.cost = cost
+        self.rx = bytearray()
+
+    def write(self, data):
+        self.clock.now += self.cost
+        self.rx += data
+        return len(data)
+
+    def read(self, size=1):
+        out = bytes(self.rx[:size])
+        del self.rx[:size]
+        return out
+
+
+class TestPollScheduler(unittest.TestCase):
+    def make(self, cost):
+        clock = FakeClock()
+        client = ModBusRtuClient(EchoConn(clock, cost), frm_time=0)
+        return PollScheduler(client, clock, clock.sleep), clock
+
+    def test_rates_met(self):
+        sched, clock = self.make(0.01)
+        fast = sched.add(PollJob(Cmd.write_do(1, 0, True), 0.05, name="fast"))
+        slow = sched.add(PollJob(Cmd.write_do(2, 0, True), 0.5))
+        sched.run(duration=2.0)
+        report = {r["name"]: r for r in sched.report()}
+        self.assertAlmostEqual(report["fast"]["achieved_rate"], 20, delta=1)
+        self.assertAlmostEqual(report["2:05"]["achieved_rate"], 2, delta=0.2)
+        self.assertEqual(fast.misses + slow.misses, 0)
+
+    def test_earliest_deadline_first(self):
+        sched, clock = self.make(0.01)
+        order = []
+        record = order.append
+        sched.add(PollJob(Cmd.write_do(1, 0, True), 1.0,
+                          callback=lambda j, r: record(j.name), name="slow"))
+        sched.add(PollJob(Cmd.write_do(2, 0, True), 0.1,
+                          callback=lambda j, r: record(j.name), name="fast"))
+        sched.run(cycles=2)
+        self.assertEqual(order, ["fast", "slow"])
+
+    def test_overload_reports_misses(self):
+        sched, clock = self.make(0.04)
+        job_a = sched.add(PollJob(Cmd.write_do(1, 0, True), 0.05))
+        job_b = sched.add(PollJob(Cmd.write_do(2, 0, True), 0.05))
+        sched.run(duration=1.0)
+        self.assertGreater(job_a.misses + job_b.misses, 0)
+        self.assertLess(job_a.achieved_rate, 20)
+
+    def test_runs_on_one_tick(self):
+        sched, clock = self.make(0.01)
+        job = sched.add(PollJob(Cmd.write_do(1, 0, True), 0.05))
+        job.runs = 2
+        job.first_run = job.last_run = 1.0
+        self.assertEqual(sched.report()[0]["achieved_rate"], 0.0)
+
+    def test_errors_counted(self):
+        clock = FakeClock()
+        conn = EchoConn(clock, 0.01)
+        # answer with the wrong function code
+        conn.write = lambda data: conn.rx.extend(b'\x01\x06')
+        client = ModBusRtuClient(conn, frm_time=0)
+        sched = PollScheduler(client, clock, clock.sleep)
+        job = sched.add(PollJob(Cmd.write_do(1, 0, True), 0.1))
+        sched.run(cycles=1)
+        self.assertEqual(job.errors, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import time
+import unittest
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuMessage, RtuReceiveAbort, RtuExceptionResponse
+)
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+
+
+class TestSimulatedSlave(unittest.TestCase):
+    def setUp(self):
+        self.slave = SimulatedSlave(1, seed=0)
+        self.conn = LoopbackConn([self.slave, SimulatedSlave(2)])
+        self.client = ModBusRtuClient(self.conn, frm_time=0)
+
+    def test_coils(self):
+        RespAnalyzer.write_do(self.client.query(Cmd.write_do(1, 2, True)))
+        resp = self.client.query(Cmd.read_do(1, 4))
+        self.assertEqual(RespAnalyzer.read_do(resp), b'\x04')
+        self.client.query(Cmd.write_all_do(1, 10, True))
+        self.assertEqual(list(self.slave.coils[:11]), [1] * 10 + [0])
+
+    def test_discrete_inputs(self):
+        self.slave.discrete_inputs[0] = 1
+        self.slave.discrete_inputs[9] = 1
+        resp = self.client.query(Cmd.read_di(1, 10))
+        self.assertEqual(RespAnalyzer.read_di(resp), b'\x01\x02')
+
+    def test_registers(self):
+        self.slave.input_regs[1000:1003] = [1, 2, 3]
+        resp = self.client.query(Cmd.read_ai_info(1, 1000, 3))
+        self.assertEqual(RespAnalyzer.read_ai_info(resp), [1, 2, 3])
+        self.client.query(Cmd.write_single_ao_info(1, 5, 0x1234))
+        resp = self.client.query(Cmd.write_multi_ao_info(1, 6, 2, [7, 8]))
+        self.assertEqual(
+            RespAnalyzer.write_multi_ao_info(resp)["number of regs preset"], 2
+        )
+        self.assertEqual(self.slave.holding_regs[5:8], [0x1234, 7, 8])
+
+    def test_diagnostic_functions(self):
+        self.slave.exception_status = 0x5a
+        resp = self.client.query(RtuMessage(1, 0x07))
+        self.assertEqual(resp.data_bytes, b'\x5a')
+        resp = self.client.query(RtuMessage(1, 0x0B))
+        self.assertEqual(resp.data_bytes, b'\x00\x00\x00\x01')
+        resp = self.client.query(RtuMessage(1, 0x11))
+        self.assertEqual(resp.data_bytes, b'\x04SIM\xff')
+
+    def test_mask_write(self):
+        self.slave.holding_regs[4] = 0x12
+        req = RtuMessage(1, 0x16, b'\x00\x04\x00\xf2\x00\x25')
+        resp = self.client.query(req)
+        self.assertEqual(resp.data_bytes, req.data_bytes)
+        self.assertEqual(self.slave.holding_regs[4], 0x17)
+
+    def test_read_write_regs(self):
+        self.slave.holding_regs[10:13] = [1, 2, 3]
+        resp = self.client.query(Cmd.read_write_multi_ao(1, 10, 3, 11, [9]))
+        self.assertEqual(RespAnalyzer.read_write_multi_ao(resp), [1, 9, 3])
+        self.client.query(Cmd.write_ao_bit(1, 10, 4, True))
+        resp = self.client.query(Cmd.read_ao_info(1, 10, 1))
+        self.assertEqual(RespAnalyzer.read_ao_info(resp), [0x11])
+        # an illegal read range leaves the registers alone
+        with self.assertRaises(RtuExceptionResponse):
+            self.client.query(Cmd.read_write_multi_ao(1, 9999, 2, 10, [0]))
+        self.assertEqual(self.slave.holding_regs[10], 0x11)
+
+    def test_exception_response(self):
+        with self.assertRaises(RtuExceptionResponse) as ctx:
+            self.client.query(Cmd.read_ai_info(1, 9999, 2))
+        self.assertEqual(ctx.exception.exception_code, 0x02)
+        self.slave.force_exception = 0x06
+        with self.assertRaises(RtuExceptionResponse) as ctx:
+            self.client.query(Cmd.read_do(1, 4))
+        self.assertEqual(ctx.exception.exception_code, 0x06)
+        self.client.query(Cmd.read_do(1, 4))
+
+    def test_byte_count_mismatch(self):
+        requests = [
+            # 0x10 for 3 registers carrying one word
+            RtuMessage(1, 0x10, b'\x00\x00\x00\x03\x06\x00\x09'),
+            RtuMessage(1, 0x10, b'\x00\x00\x00\x01\x04\x00\x09'),
+            # 0x0F for 10 coils with a one byte bitmap
+            RtuMessage(1, 0x0F, b'\x00\x00\x00\x0a\x01\xff'),
+            # 0x17 writing 2 registers with a byte count of 2
+            RtuMessage(
+                1, 0x17, b'\x00\x00\x00\x01\x00\x00\x00\x02\x02\x00\x09'
+            ),
+        ]
+        for req in requests:
+            with self.assertRaises(RtuExceptionResponse) as ctx:
+                self.client.query(req)
+            self.assertEqual(ctx.exception.exception_code, 0x03)
+        self.assertEqual(self.slave.holding_regs[:3], [0, 0, 0])
+        self.assertEqual(list(self.slave.coils[:10]), [0] * 10)
+
+    def test_injected_faults(self):
+        self.slave.crc_error_rate = 1.0
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[CrcCheck\]"):
+            self.client.query(Cmd.read_do(1, 4))
+        self.slave.crc_error_rate = 0.0
+        self.slave.drop_rate = 1.0
+        with self.assertRaises(RtuReceiveAbort):
+            self.client.query(Cmd.read_ai_info(1, 0, 10))
+        self.slave.drop_rate = 0.0
+        self.slave.silence_rate = 1.0
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[AddrState\]"):
+            self.client.query(Cmd.read_do(1, 4))
+
+    def test_unknown_slave_and_broadcast(self):
+        with self.assertRaisesRegex(RtuReceiveAbort, r"\[AddrState\]"):
+            self.client.query(Cmd.read_do(7, 4))
+        self.client.send(Cmd.write_do(0, 3, True))
+        self.assertEqual(self.conn.in_waiting, 0)
+        self.assertEqual(self.slave.coils[3], 1)
+
+
+class TestLoopbackTiming(unittest.TestCase):
+    def test_wire_time(self):
+        # 9600 baud, 11 bits per char: 8 byte request, 45 byte response
+        conn = LoopbackConn(SimulatedSlave(1), baudrate=9600, latency=0.002)
+        client = ModBusRtuClient(conn, frm_time=11 / 9600)
+        start = time.perf_counter()
+        client.query(Cmd.read_ai_info(1, 0, 20))
+        elapsed = time.perf_counter() - start
+        self.assertGreater(elapsed, 53 * 11 / 9600 + 0.002)
+        self.assertLess(elapsed, 0.2)
+
+    def test_timeout(self):
+        slave = SimulatedSlave(1)
+        slave.silence_rate = 1.0
+        conn = LoopbackConn(slave, baudrate=115200)
+        client = ModBusRtuClient(conn, response_timeout=0.02)
+        start = time.perf_counter()
+        with self.assertRaises(RtuReceiveAbort):
+            client.query(Cmd.read_do(1, 4))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import io
+import random
+import unittest
+from modbus_rtu_client.base import cal_crc
+from modbus_rtu_client.cmd import Cmd
+from modbus_rtu_client.sniffer import BusSniffer, sniff
+
+
+def with_crc(raw):
+    return raw + cal_crc(raw).to_bytes(2, "little")
+
+
+REQ_AI = Cmd.read_ai_info(1, 0, 2).encode()
+RESP_AI = with_crc(b'\x01\x04\x04\x00\x0a\x00\x0b')
+REQ_DO = Cmd.write_do(2, 1, True).encode()
+REQ_MULTI = Cmd.write_all_do(2, 10, False).encode()
+RESP_MULTI = with_crc(b'\x02\x0f\x00\x00\x00\x0a')
+RESP_EXC = with_crc(b'\x01\x84\x02')
+REQ_RW = Cmd.read_write_multi_ao(3, 0, 2, 8, [1, 2]).encode()
+RESP_RW = with_crc(b'\x03\x17\x04\x00\x05\x00\x06')
+
+CAPTURE = [
+    ("request", REQ_AI), ("response", RESP_AI),
+    ("request", REQ_DO), ("response", REQ_DO),
+    ("request", REQ_MULTI), ("response", RESP_MULTI),
+    ("request", REQ_AI), ("response", RESP_EXC),
+    ("request", REQ_RW), ("response", RESP_RW),
+]
+
+
+class TestSniffer(unittest.TestCase):
+    def check(self, frames, expected=CAPTURE):
+        self.assertEqual(
+            [(f.kind, f.message.encode()) for f in frames], expected
+        )
+
+    def test_whole_capture(self):
+        data = b''.join(frame for _, frame in CAPTURE)
+        self.check(list(sniff(io.BytesIO(data))))
+
+    def test_random_chunks(self):
+        data = b''.join(frame for _, frame in CAPTURE) * 50
+        rng = random.Random(1)
+        chunks = []
+        pos = 0
+        while pos < len(data):
+            size = rng.randint(1, 9)
+            chunks.append(data[pos:pos + size])
+            pos += size
+        self.check(list(sniff(chunks)), CAPTURE * 50)
+
+    def test_noise_is_skipped(self):
+        sniffer = BusSniffer()
+        data = b'\x00\xff\x55' + REQ_AI + b'\x01' + RESP_AI
+        frames = list(sniffer.feed(data))
+        self.check(frames, CAPTURE[:2])
+        self.assertEqual(sniffer.garbage_bytes, 4)
+
+    def test_silence_drops_partial_frame(self):
+        chunks = [
+            (0.0, REQ_AI[:5]),
+            (0.5, REQ_AI),
+            (0.51, RESP_AI),
+        ]
+        frames = list(sniff(chunks, frame_gap=0.01))
+        self.check(frames, CAPTURE[:2])
+        self.assertEqual(frames[1].timestamp, 0.51)
+
+    def test_feed_is_eager(self):
+        sniffer = BusSniffer()
+        sniffer.feed(REQ_AI[:3])
+        self.check(sniffer.feed(REQ_AI[3:]), CAPTURE[:1])
+
+    def test_frames_are_returned_once(self):
+        sniffer = BusSniffer()
+        data = b''.join(frame for _, frame in CAPTURE)
+        next(iter(sniffer.feed(data)))
+        self.assertEqual(sniffer.feed(b''), [])
+        self.assertEqual(sniffer.frames, len(CAPTURE))
+
+    def test_bounded_buffer(self):
+        sniffer = BusSniffer()
+        data = b''.join(frame for _, frame in CAPTURE)
+        for _ in range(200):
+            for _ in sniffer.feed(data):
+                pass
+            self.assertLess(len(sniffer._buf), 16)
+        self.assertEqual(sniffer.frames, 200 * len(CAPTURE))
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
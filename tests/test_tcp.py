@@ -0,0 +1,276 @@
+import socket
+import struct
+import threading
+import time
+import unittest
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuMessage, RtuReceiveAbort, RtuExceptionResponse,
+    RtuReceiveTimeout
+)
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer
+from modbus_rtu_client.sim import SimulatedSlave
+from modbus_rtu_client.tcp import TcpConn, ModBusTcpClient, ConnectionPool
+
+MBAP = struct.Struct(">HHHB")
+
+
+def recv_exact(sock, size):
+    buf = b''
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError
+        buf += chunk
+    return buf
+
+
+class SlaveServer:
+    """
+    local tcp server in front of a SimulatedSlave. rtu mode echoes rtu
+    frames, tcp mode speaks mbap and answers each batch of `batch`
+    requests in reverse order. drop_after closes a connection after
+    that many requests, split sends rtu answers in two segments that
+    many seconds apart.
+    """
+    def __init__(self, slave, mbap=False, batch=1, drop_after=None):
+        self.slave = slave
+        # answers pass through mangle(answer) before they are sent
+        self.mangle = None
+        self.mbap = mbap
+        self.batch = batch
+        self.drop_after = drop_after
+        self.split = None
+        self.connections = 0
+        self.silent = set()
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(
+                target=self._serve, args=(conn,), daemon=True
+            ).start()
+
+    def _serve(self, conn):
+        served = 0
+        with conn:
+            try:
+                while self.drop_after is None or served < self.drop_after:
+                    if self.mbap:
+                        self._serve_mbap(conn)
+                    else:
+                        frame = conn.recv(256)
+                        if not frame:
+                            return
+                        resp = self.slave.handle(frame)
+                        if resp is None:
+                            pass
+                        elif self.split is None:
+                            conn.sendall(resp)
+                        else:
+                            conn.sendall(resp[:5])
+                            time.sleep(self.split)
+                            conn.sendall(resp[5:])
+                    served += 1
+            except ConnectionError:
+                return
+
+    def _serve_mbap(self, conn):
+        answers = []
+        for _ in range(self.batch):
+            tid, _, length, unit = MBAP.unpack(recv_exact(conn, 7))
+            pdu = recv_exact(conn, length - 1)
+            if unit in self.silent:
+                continue
+            frame = RtuMessage(unit, pdu[0], pdu[1:]).encode()
+            resp = self.slave.handle(frame)
+            body = resp[1:-2]
+            answer = MBAP.pack(tid, 0, len(body) + 1, unit) + body
+            if self.mangle is not None:
+                answer = self.mangle(answer)
+            answers.append(answer)
+        for answer in reversed(answers):
+            conn.sendall(answer)
+
+    def close(self):
+        self.sock.close()
+
+
+class TestTcpConn(unittest.TestCase):
+    def setUp(self):
+        self.slave = SimulatedSlave(1)
+        self.server = SlaveServer(self.slave, drop_after=1)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_rtu_over_tcp_reconnects(self):
+        conn = TcpConn("127.0.0.1", self.server.port, timeout=0.5,
+                       inter_byte_timeout=0.05)
+        client = ModBusRtuClient(conn, frm_time=0, response_timeout=0.5)
+        self.slave.input_regs[1000:1002] = [3, 4]
+        for _ in range(3):
+            resp = client.query(Cmd.read_ai_info(1, 1000, 2))
+            self.assertEqual(RespAnalyzer.read_ai_info(resp), [3, 4])
+            # let the server's close arrive before the next request
+            deadline = time.monotonic() + 1
+            while not conn.in_waiting and time.monotonic() < deadline:
+                time.sleep(0.001)
+        self.assertEqual(conn.reconnects, 2)
+        conn.close()
+
+    def test_reply_in_two_segments(self):
+        self.server.drop_after = None
+        self.server.split = 0.01
+        conn = TcpConn("127.0.0.1", self.server.port, timeout=0.5,
+                       inter_byte_timeout=0.05)
+        client = ModBusRtuClient(conn, frm_time=0, response_timeout=0.5)
+        self.assertEqual(conn.inter_byte_timeout, 0.05)
+        self.slave.input_regs[1000:1002] = [3, 4]
+        resp = client.query(Cmd.read_ai_info(1, 1000, 2))
+        self.assertEqual(RespAnalyzer.read_ai_info(resp), [3, 4])
+        conn.close()
+
+
+class TestModBusTcpClient(unittest.TestCase):
+    def setUp(self):
+        self.slave = SimulatedSlave(1)
+        self.slave.input_regs[1000:1008] = range(8)
+
+    def test_pipelined_out_of_order(self):
+        server = SlaveServer(self.slave, mbap=True, batch=8)
+        with ModBusTcpClient("127.0.0.1", server.port) as client:
+            futures = [
+                client.submit(Cmd.read_ai_info(1, 1000 + i, 1))
+                for i in range(8)
+            ]
+            values = [
+                RespAnalyzer.read_ai_info(f.result(1)) for f in futures
+            ]
+        self.assertEqual(values, [[i] for i in range(8)])
+        server.close()
+
+    def test_exception_and_timeout(self):
+        server = SlaveServer(self.slave, mbap=True)
+        server.silent.add(9)
+        with ModBusTcpClient("127.0.0.1", server.port, timeout=0.1) as c:
+            with self.assertRaises(RtuExceptionResponse) as ctx:
+                c.query(Cmd.read_ai_info(1, 20000, 1))
+            self.assertEqual(ctx.exception.exception_code, 0x02)
+            with self.assertRaises(RtuReceiveTimeout):
+                c.query(Cmd.read_ai_info(9, 1000, 1))
+        server.close()
+
+    def test_silent_unit_does_not_hold_slots(self):
+        server = SlaveServer(self.slave, mbap=True)
+        server.silent.add(9)
+        with ModBusTcpClient(
+                "127.0.0.1", server.port, timeout=0.05,
+                max_inflight=2) as client:
+            lost = [client.submit(Cmd.read_ai_info(9, 0, 1))
+                    for _ in range(2)]
+            resp = client.submit(Cmd.read_ai_info(1, 1000, 1)).result(1)
+            self.assertEqual(RespAnalyzer.read_ai_info(resp), [0])
+            for future in lost:
+                with self.assertRaises(RtuReceiveTimeout):
+                    future.result(0)
+        server.close()
+
+    def test_concurrent_submits(self):
+        server = SlaveServer(self.slave, mbap=True)
+        values = list(range(100))
+        with ModBusTcpClient("127.0.0.1", server.port) as client:
+            def worker(i):
+                for _ in range(20):
+                    client.query(
+                        Cmd.write_multi_ao_info(1, 100 * i, 100, values)
+                    )
+
+            threads = [
+                threading.Thread(target=worker, args=(i,)) for i in range(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(client.reconnects, 0)
+        self.assertEqual(self.slave.holding_regs[:400], values * 4)
+        server.close()
+
+    def test_malformed_replies(self):
+        server = SlaveServer(self.slave, mbap=True)
+        read = Cmd.read_ai_info(1, 1000, 1)
+        cases = [
+            # 1 byte exception pdu, the stream stays in step
+            (lambda a: a[:4] + b'\x00\x02\x01\x84', False),
+            # other unit and other function code
+            (lambda a: a[:6] + b'\x07' + a[7:], False),
+            (lambda a: a[:7] + b'\x03' + a[8:], False),
+            # lengths that cannot hold a pdu and a non-zero protocol id
+            (lambda a: a[:4] + b'\x00\x00' + a[6:7], True),
+            (lambda a: a[:4] + b'\x00\x01' + a[6:7], True),
+            (lambda a: a[:2] + b'\x00\x01' + a[4:], True),
+        ]
+        with ModBusTcpClient(
+                "127.0.0.1", server.port, max_inflight=1) as client:
+            for mangle, drops in cases:
+                server.mangle = mangle
+                with self.assertRaises(RtuReceiveAbort):
+                    client.query(read)
+                if drops:
+                    deadline = time.monotonic() + 1
+                    while client.connected and time.monotonic() < deadline:
+                        time.sleep(0.001)
+                    self.assertFalse(client.connected)
+                server.mangle = None
+                resp = client.query(read)
+                self.assertEqual(RespAnalyzer.read_ai_info(resp), [0])
+            self.assertEqual(client.reconnects, 3)
+        server.close()
+
+    def test_reconnect(self):
+        server = SlaveServer(self.slave, mbap=True, drop_after=1)
+        with ModBusTcpClient("127.0.0.1", server.port) as client:
+            for i in range(3):
+                resp = client.query(Cmd.read_ai_info(1, 1000 + i, 1))
+                self.assertEqual(RespAnalyzer.read_ai_info(resp), [i])
+                deadline = time.monotonic() + 1
+                while client.connected and time.monotonic() < deadline:
+                    time.sleep(0.001)
+            self.assertEqual(client.reconnects, 2)
+        server.close()
+
+    def test_pool(self):
+        server = SlaveServer(self.slave, mbap=True)
+        pool = ConnectionPool(
+            lambda: ModBusTcpClient("127.0.0.1", server.port), size=2
+        )
+        barrier = threading.Barrier(4)
+        results = []
+
+        def worker(i):
+            barrier.wait()
+            resp = pool.query(Cmd.read_ai_info(1, 1000 + i, 1))
+            results.append(RespAnalyzer.read_ai_info(resp)[0])
+
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with self.assertRaises(RtuExceptionResponse):
+            pool.query(Cmd.read_ai_info(1, 20000, 1))
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertLessEqual(server.connections, 2)
+        pool.close()
+        server.close()
\ No newline at end of file
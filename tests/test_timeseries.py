@@ -0,0 +1,52 @@
+import io
+import unittest
+from array import array
+from modbus_rtu_client.base import RtuMessage, cal_crc
+from modbus_rtu_client.timeseries import RingBuffer, SeriesWriter, read_series
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_wraps_at_capacity(self):
+        ring = RingBuffer(3, width=2)
+        for t in range(5):
+            ring.append([t, t * 10], timestamp=float(t))
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.times().tolist(), [2.0, 3.0, 4.0])
+        self.assertEqual(ring.values().tolist(), [2, 20, 3, 30, 4, 40])
+        with self.assertRaises(ValueError):
+            ring.append([1])
+
+    def test_window_and_downsample(self):
+        ring = RingBuffer(10)
+        for t in range(6):
+            ring.append([t], timestamp=t * 0.5)
+        times, values = ring.window(1.0, 2.0)
+        self.assertEqual(times.tolist(), [1.0, 1.5, 2.0])
+        self.assertEqual(values.tolist(), [2, 3, 4])
+        times, values = ring.downsample(1.0)
+        self.assertEqual(times.tolist(), [0.0, 1.0, 2.0])
+        self.assertEqual(values.tolist(), [0.5, 2.5, 4.5])
+
+    def test_append_response(self):
+        raw = b'\x01\x04\x04\xff\xfe\x00\x03'
+        resp = RtuMessage()
+        resp.decode(raw + cal_crc(raw).to_bytes(2, "little"))
+        ring = RingBuffer(4, width=2, dtype="i2")
+        ring.append_response(resp, timestamp=1.0)
+        self.assertEqual(ring.values().tolist(), [-2, 3])
+
+    def test_stream_to_disk(self):
+        f = io.BytesIO()
+        ring = RingBuffer(2, width=2)
+        ring.sink = SeriesWriter(f, width=2)
+        for t in range(3):
+            ring.append(array("H", [t, 0xffff]), timestamp=float(t))
+        f.seek(0)
+        records = [(t, v.tolist()) for t, v in read_series(f)]
+        self.assertEqual(records, [
+            (0.0, [0, 0xffff]), (1.0, [1, 0xffff]), (2.0, [2, 0xffff])
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+import threading
+import unittest
+from modbus_rtu_client.base import (
+    ModBusRtuClient, RtuReceiveAbort, RtuExceptionResponse
+)
+from modbus_rtu_client.cmd import Cmd, RespAnalyzer
+from modbus_rtu_client.sim import SimulatedSlave, LoopbackConn
+from modbus_rtu_client.worker import BusWorker, PRIORITY_LOW
+
+
+class GatedClient:
+    """
+    holds the first query until released, records the order of the rest
+    """
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.order = []
+
+    def query(self, message):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(2)
+        self.order.append(message.raw)
+        return message
+
+
+class TestBusWorker(unittest.TestCase):
+    def test_priority_order(self):
+        client = GatedClient()
+        with BusWorker(client) as worker:
+            worker.submit(Cmd.read_di(1, 1))
+            client.started.wait(2)
+            polls = worker.submit_batch(
+                [Cmd.read_ai_info(1, i, 1) for i in range(3)], PRIORITY_LOW
+            )
+            read = worker.submit(Cmd.read_do(1, 4))
+            write = worker.submit(Cmd.write_do(1, 0, True))
+            polls[1].cancel()
+            client.release.set()
+            write.result(2)
+            read.result(2)
+            polls[2].result(2)
+        self.assertEqual(client.order[1:], [
+            Cmd.write_do(1, 0, True).raw,
+            Cmd.read_do(1, 4).raw,
+            Cmd.read_ai_info(1, 0, 1).raw,
+            Cmd.read_ai_info(1, 2, 1).raw,
+        ])
+
+    def test_threads_share_the_bus(self):
+        slave = SimulatedSlave(1)
+        slave.input_regs[:8] = range(8)
+        client = ModBusRtuClient(LoopbackConn([slave]), frm_time=0)
+        results = {}
+        with BusWorker(client) as worker:
+            def poll(i):
+                resp = worker.query(Cmd.read_ai_info(1, i, 1), timeout=2)
+                results[i] = RespAnalyzer.read_ai_info(resp)
+
+            threads = [
+                threading.Thread(target=poll, args=(i,)) for i in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(results, {i: [i] for i in range(8)})
+
+    def test_stream(self):
+        slave = SimulatedSlave(1)
+        client = ModBusRtuClient(LoopbackConn([slave]), frm_time=0)
+        messages = [Cmd.read_ai_info(1, 0, 1), Cmd.read_ai_info(1, 20000, 1)]
+        with BusWorker(client) as worker:
+            done = dict(worker.stream(messages, timeout=2))
+        self.assertEqual(sorted(done), [0, 1])
+        self.assertEqual(RespAnalyzer.read_ai_info(done[0].result()), [0])
+        self.assertIsInstance(done[1].exception(), RtuExceptionResponse)
+
+    def test_close_fails_queued(self):
+        client = GatedClient()
+        worker = BusWorker(client)
+        first = worker.submit(Cmd.read_di(1, 1))
+        client.started.wait(2)
+        queued = worker.submit(Cmd.read_di(1, 2))
+        threading.Timer(0.05, client.release.set).start()
+        worker.close()
+        self.assertIsNotNone(first.result(0))
+        self.assertIsInstance(queued.exception(0), RtuReceiveAbort)
+        with self.assertRaises(RuntimeError):
+            worker.submit(Cmd.read_di(1, 1))
\ No newline at end of file